@@ -1,16 +1,36 @@
 import streamlit as st
 from streamlit_option_menu import option_menu
 import time
-import pickle
-import numpy as np
 import pandas as pd
 import requests
-from dotenv import load_dotenv
 import os
-import google.generativeai as genai
+import logging
+from src.artifacts import get_registry
+from src.city_meta import CityMetadata
+from src.engine import RecommendationEngine
+from src.llm import gather_responses_sync, get_response, stream_response
+from src.metrics import profile, start_server, timed
+from src.prompts import (
+    accommodation_input, food_input, planner_input, transport_input, trip_requests,
+    input_prompt_accommodation, input_prompt_food, input_prompt_planner, input_prompt_transport,
+)
 
 st.set_page_config(layout="wide")
 
+# METRICS_PORT serves /metrics (Prometheus) and /metrics.json from this process (src/metrics.py)
+start_server()
+
+# Log messages of src/ (e.g. each artifact load with its time and resident memory) at LOG_LEVEL
+logging.basicConfig(format="%(asctime)s %(name)s %(levelname)s %(message)s")
+logging.getLogger('src').setLevel(os.getenv('LOG_LEVEL', 'INFO'))
+
+
+# Shared artifact store: loaded once per process and reused across reruns and sessions
+# ARTIFACT_FORMAT: 'pickle' (artifacts/*.pkl) or 'mmap' (memory-mapped artifacts/mmap/*.npy)
+@st.cache_resource
+def load_artifacts():
+    return get_registry(os.getenv('ARTIFACT_FORMAT', 'pickle'))
+
 # Navigation Bar
 selected = option_menu(
     menu_title = None,
@@ -83,16 +103,11 @@ if selected == "Home":
 if selected == "Travel Recommendation":
 
     st.title("Travel Recommendation System")
-    # Import artifacts
-    travel = pickle.load(open('artifacts/place_list.pkl', 'rb'))
-    similarity = pickle.load(open('artifacts/similarity.pkl', 'rb'))
-    model = pickle.load(open('artifacts/model.pkl', 'rb'))
-    city_name = pickle.load(open('artifacts/city_name.pkl', 'rb'))
-    city_pivot = pickle.load(open('artifacts/city_pivot.pkl', 'rb'))
-    final_rating = pickle.load(open('artifacts/final_rating.pkl', 'rb'))
+    # Import artifacts (only reloaded when the file on disk changes)
+    artifacts = load_artifacts()
 
-    # Load the Excel file containing city links
-    links_data = pd.read_excel("Data/Links.xlsx")
+    # City links and info from Links.xlsx, indexed by City once per process
+    city_metadata = artifacts.derived('city_metadata', CityMetadata, 'links')
 
     # Define the tooltip CSS
     tooltip_css = """
@@ -131,53 +146,12 @@ if selected == "Travel Recommendation":
     st.markdown(tooltip_css, unsafe_allow_html=True)
 
 
-    # Content Based
-    def recommend(place):
-        # Check if the place exists in the travel DataFrame
-        if place not in travel['city'].values:
-            return []  # Return an empty list or handle it as needed
-
-        index = travel[travel['city'] == place].index[0]
-        distances = sorted(list(enumerate(similarity[index])),reverse=True, key = lambda x:x[1])
-        recommended_place_name = []
-        #recommended_place_poster = []
-
-        for i in distances[1:7]:
-            c_id = travel.iloc[i[0]].c_id
-            #recommended_place_poster.append(fetch_poster(c_id))
-            recommended_place_name.append(travel.iloc[i[0]].city)
-
-        return recommended_place_name
-
-    # Collaborative Filtering
-    def recommend_city(city_name):
-        cities_list = []
-        # Check if the city_name exists in the city_pivot index
-        if city_name not in city_pivot.index:
-            return []  # Return an empty list if the city is not found
-
-        city_id = np.where(city_pivot.index == city_name)[0][0]
-        distance, suggestion = model.kneighbors(city_pivot.iloc[city_id,:].values.reshape(1,-1), n_neighbors = 6)
-    
-        for i in range(len(suggestion)):
-            cities = city_pivot.index[suggestion[i]]
-            for j in cities:
-                cities_list.append(j)
-
-        return cities_list
-
-    # Function to validate city names
-    def is_valid_city(city):
-        # Example criteria: names should be longer than one character and contain only letters
-        return len(city) > 1 
-
-    # Combine and filter city names
-    place_list = set(filter(is_valid_city, city_name))  # Filtered unique cities from city_name
-    place_list.update(filter(is_valid_city, travel['city'].values))  # Filtered unique cities from travel['city']
-    place_list = list(place_list)  # Convert back to a list
+    # Content based + collaborative recommenders (src/engine.py)
+    # CONTENT_INDEX: 'dense' (similarity.pkl), 'sparse' (content_vectors.npz) or 'neighbours' (content_neighbours.npz)
+    engine = RecommendationEngine(artifacts, os.getenv('CONTENT_INDEX', 'dense'))
 
-    # Sort the place_list alphabetically
-    place_list = sorted(place_list)
+    # Sorted, de-duplicated city names from city_name and travel['city']
+    place_list = engine.place_list()
 
     # Get the total number of unique cities
     total_cities = len(place_list)
@@ -187,39 +161,64 @@ if selected == "Travel Recommendation":
 
     selected_city = st.selectbox(
         "Type or select a City",
-        place_list
+        place_list,
+        accept_new_options=True
     )
 
-    # Function to get URL for a city
-    def get_city_url(city_name):
-        match = links_data[links_data['City'] == city_name]
-        if not match.empty:
-            return match.iloc[0]['URL']
-        return "#"  # Return a default value if no match is found
-
-    # Function to get information about a city
-    def get_city_info(city_name):
-        match = links_data[links_data['City'] == city_name]
-        if not match.empty:
-            return {
-                'Country': match.iloc[0]['Country'],
-                'Population': match.iloc[0]['Population'],
-                'Area (sq mi)': match.iloc[0]['Area (sq mi)'],
-            }
-        return None  # Return a default value if no match is found
+    # Typed text that is not in the list (lowercase, alias, typo) is matched by the search index
+    if selected_city and selected_city not in engine.search_index():
+        resolved_city = engine.resolve(selected_city)
+        if resolved_city:
+            st.caption(f"Showing results for {resolved_city}")
+            selected_city = resolved_city
+        else:
+            suggestions = engine.search(selected_city, limit=5)
+            st.caption("No city found." + (f" Did you mean: {', '.join(suggestions)}?" if suggestions else ""))
+
+    # Returning users can enter their User ID to also get cities picked from their own ratings
+    user_id = st.text_input("Your User ID (optional)", placeholder="e.g. U-1").strip()
+
+    # Function to display cities with their links and info tooltips in rows of 5
+    def show_city_grid(cities):
+        num_columns = 5
+        cols = st.columns(num_columns)  # Create 5 columns
+
+        # URL and info for every recommended city in one lookup
+        city_cards = city_metadata.get_city_cards(cities)
+
+        for i, (city, card) in enumerate(zip(cities, city_cards)):
+            col_index = i % num_columns  # Determine the column index
+            with cols[col_index]:
+                url = card['URL']
+                city_info = card['info']  # None if the city has no row in Links.xlsx
+                if city_info:  # Check if city_info is not None
+                    tooltip_text = (
+                        f"Country: {city_info.get('Country', 'N/A')}<br>"
+                        f"Population: {city_info.get('Population', 'N/A')}<br>"
+                        f"Area: {city_info.get('Area (sq mi)', 'N/A')} sq mi"
+                    )
+                else:
+                    tooltip_text = "No info available"
+            
+                link_html = f'''
+                <div class="tooltip">
+                    <a href="{url}" style="font-weight: bold; text-decoration: none; color: black;">{city}</a>
+                    <span class="tooltiptext">{tooltip_text}</span>
+                </div>
+                '''
+                st.markdown(f'<div style="text-align: center; margin: 10px;">{link_html}</div>', unsafe_allow_html=True)
+
+            # If we reach the last column, create a new row
+            if col_index == num_columns - 1 and i < len(cities) - 1:
+                cols = st.columns(num_columns)  # Create new columns for the next row
 
     if st.button('Show Recommendation'):
         st.write("Your Recommendations are: ")
-        recommendation_cities = recommend_city(selected_city)
-        recommended_place_name = recommend(selected_city)
-        # Combine the two lists and remove duplicates
-        combined_recommendations = set(recommended_place_name + recommendation_cities)
-
-        # Remove the selected city if it's in the combined recommendations
-        combined_recommendations.discard(selected_city)
-
-        # Convert back to a list
-        combined_recommendations = list(combined_recommendations)
+        # Both recommenders, blended into one ranking (HYBRID_CONTENT_WEIGHT sets the mix)
+        # PROFILE=cprofile|pyinstrument keeps a profile of every request under .cache/profiles
+        with profile('travel_recommendation'), timed('page_seconds', page='travel_recommendation'):
+            combined_recommendations = engine.recommend_all(selected_city)['recommendations']
+            personal = engine.recommend_user(user_id) if user_id else None
 
         # Show total count of cities
         total_count = len(combined_recommendations)
@@ -229,50 +228,43 @@ if selected == "Travel Recommendation":
         if not combined_recommendations:
             st.write("No recommendations available.")
         else:
-            # Display the combined recommendations in rows of 5
-            num_columns = 5
-            cols = st.columns(num_columns)  # Create 5 columns
-
-            for i, city in enumerate(combined_recommendations):
-                col_index = i % num_columns  # Determine the column index
-                with cols[col_index]:
-                    url = get_city_url(city)  # Assuming you have a function to get the URL
-                    city_info = get_city_info(city)  # Get city information
-                    if city_info:  # Check if city_info is not None
-                        tooltip_text = (
-                            f"Country: {city_info.get('Country', 'N/A')}<br>"
-                            f"Population: {city_info.get('Population', 'N/A')}<br>"
-                            f"Area: {city_info.get('Area (sq mi)', 'N/A')} sq mi"
-                        )
-                    else:
-                        tooltip_text = "No info available"
-                
-                    link_html = f'''
-                    <div class="tooltip">
-                        <a href="{url}" style="font-weight: bold; text-decoration: none; color: black;">{city}</a>
-                        <span class="tooltiptext">{tooltip_text}</span>
-                    </div>
-                    '''
-                    st.markdown(f'<div style="text-align: center; margin: 10px;">{link_html}</div>', unsafe_allow_html=True)
-
-                # If we reach the last column, create a new row
-                if col_index == num_columns - 1 and i < len(combined_recommendations) - 1:
-                    cols = st.columns(num_columns)  # Create new columns for the next row
+            show_city_grid(combined_recommendations)
+
+        if personal is not None:
+            if personal['recommendations']:
+                st.subheader("Picked for you")
+                st.caption(f"Based on the cities {user_id} has rated")
+                show_city_grid(personal['recommendations'])
+            else:
+                st.caption(f"No ratings found for {user_id}, so there are no personal picks yet.")
+
+    # Load time and resident memory of every artifact loaded so far (src/artifacts.py)
+    with st.sidebar.expander("Artifact stats"):
+        loaded = pd.DataFrame([s for s in artifacts.stats() if s['loaded']], columns=['name', 'load_seconds', 'bytes', 'loads'])
+        loaded['MiB'] = (loaded.pop('bytes') / 2**20).round(2)
+        st.dataframe(loaded, hide_index=True)
     
 
 ###########################################################################################
 # To display the itinerary page
 if selected == "Itinerary Planner":
 
-    # Load the API Key
-    load_dotenv()
-    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-
-    # Function to load Google Gemini Pro Model and get response
-    def get_response(prompt, input):
-        model = genai.GenerativeModel('gemini-1.5-flash-001')
-        response = model.generate_content([prompt, input], stream=False)
-        return response.text
+    # The API key is loaded and the Gemini model created once per process (src/llm.py)
+    # LLM_STREAM=0 waits for the full response instead of rendering chunks as they arrive
+    stream_responses = os.getenv('LLM_STREAM', '1') != '0'
+
+    # Function to render a response inside the justified block, chunk by chunk when streaming
+    def show_response(prompt, input):
+        placeholder = st.empty()
+        if not stream_responses:
+            response = get_response(prompt, input)
+            placeholder.markdown(f'<div style="text-align: justify;">{response}</div>', unsafe_allow_html=True)
+            return response
+        response = ""
+        for chunk in stream_response(prompt, input):
+            response += chunk
+            placeholder.markdown(f'<div style="text-align: justify;">{response}</div>', unsafe_allow_html=True)
+        return response
 
     # Initialize the streamlit app
     # st.set_page_config(page_title="Planner: Discover and Plan your Culinary Adventures!")
@@ -307,70 +299,37 @@ if selected == "Itinerary Planner":
 
     # If the choice is Trip Planner
     if section_choice == "Trip Planner":
-        # Prompt Template
-        input_prompt_planner = """
-        You are an expert Tour Planner and Travel Consultant. Your job is to create a highly personalized travel plan based on the following attributes:
-        1. Location: The main destination(s) or cities provided by the user.
-        2. Budget: Plan activities, accommodations, and meals within the specified budget range.
-        3. Travel Dates (Duration): Include plans for the given number of days or estimate an appropriate duration if not provided. Suggest suitable travel dates or seasons.
-        4. Travel Party: Cater to the group type (e.g., solo traveler, couple, family, or friends) and their specific needs or dynamics.
-        5. Activities and Interests: Focus on the user's preferences such as adventure (e.g., hiking, water sports), relaxation (e.g., spa, beaches), cultural (e.g., museums, heritage sites), or nightlife and shopping.
-        For the plan:
-        - Suggest an optimal itinerary with day-wise recommendations for activities and places to visit.
-        - Highlight hidden secrets, must-visit landmarks, and off-the-beaten-path gems.
-        - Mention the best time or season to visit the destination.
-        - Provide safety tips, sustainability tips, and any other special considerations.
-        Return the response in markdown format for easy readability, with clear headings, subheadings, and a day-wise itinerary breakdown.
-        """
-
         # Input Fields
         location = st.text_input("Enter the location:")
         budget = st.text_input("Enter your budget (e.g., Low, Medium, High):")
         travel_dates = st.text_input("Enter travel dates (e.g., 5 days, 1 week):")
         travel_party = st.selectbox("Select your travel party:", ["Solo", "Couple", "Family", "Friends"])
         activities_interests = st.multiselect("Select activities and interests:", ["Adventure", "Relaxation", "Cultural", "Shopping", "Nightlife"])
+        full_trip = st.checkbox("Also suggest accommodation, transport and food")
 
         # Button
         submit1 = st.button("Plan my Trip!")
-        if submit1:
+        if submit1 and full_trip:
+            # Send the four section prompts concurrently and show them as they are all ready
+            with st.spinner("Planning your trip..."):
+                responses = gather_responses_sync(trip_requests(location, budget, travel_dates, travel_party, activities_interests))
+            for section, response in responses.items():
+                st.subheader(f"{section}: ")
+                if isinstance(response, Exception):
+                    st.error(f"Could not get {section} suggestions: {response}")
+                else:
+                    st.markdown(f'<div style="text-align: justify;">{response}</div>', unsafe_allow_html=True)
+        elif submit1:
             # Construct the input plan based on user inputs
-            input_plan = f"""
-            Location: {location}
-            Budget: {budget}
-            Travel Dates: {travel_dates}
-            Travel Party: {travel_party}
-            Activities and Interests: {', '.join(activities_interests)}
-            """
-            
-            response = get_response(input_prompt_planner, input_plan)
+            input_plan = planner_input(location, budget, travel_dates, travel_party, activities_interests)
+
             st.subheader("Itinerary Planner: ")
-            # Justify the response text using HTML and CSS
-            justified_response = f'<div style="text-align: justify;">{response}</div>'
-            st.markdown(justified_response, unsafe_allow_html=True)
+            show_response(input_prompt_planner, input_plan)
 
     
     # If the choice is Accommodation
     if section_choice == "Accommodation":
 
-        # Accommodation Preferences Prompt Template
-        input_prompt_accommodation = """
-        You are an expert Accommodation Advisor. Your primary goal is to provide tailored accommodation recommendations based on the user's input preferences.
-        Consider the following factors:
-        1. Location: The main destination(s) or cities provided by the user.
-        2. Budget: Recommendations should align with the budget range provided (e.g., low, medium, high).
-        3. Type of Accommodation: The user has specified their preferred type, such as Hotels, Hostels, Vacation Rentals, or Camping.
-        4. Proximity to Attractions: Consider the user's proximity preferences, whether they prefer accommodations close to major attractions, in well-connected areas, or in quiet neighborhoods.
-        5. Travel Party: Adjust recommendations to suit the travel party, such as solo travelers, couples, families, or groups of friends. For example:
-            - Families: Family-friendly accommodations with extra amenities for kids.
-            - Couples: Romantic settings or privacy-focused options.
-            - Solo Travelers: Budget-friendly or dorm-style rooms.
-            - Friends: Spacious and social settings like hostels or group vacation rentals.
-        For the Accommodation:
-        - Provide rating of the Hotels/Hostels/Vacation Rentals, or Camping (in a table format)
-        - Top 5 hotels within the budget and proximity to Attractions given by the user with address and average cost per night (in a table format)
-        Format the response in markdown for clear presentation.
-        """
-
         # Input Fields
         location = st.text_input("Enter the location:")
         budget = st.text_input("Enter your budget (e.g., Low, Medium, High):")
@@ -382,47 +341,15 @@ if selected == "Itinerary Planner":
         submit2 = st.button("Find Accommodation!")
         if submit2:
             # Construct the input plan based on user inputs
-            input_accommodation = f"""
-            Location: {location}
-            Budget: {budget}
-            Accommodation Type: {accommodation_type}
-            Proximity to Attractions: {', '.join(proximity_to_attractions)}
-            Travel Party: {travel_party}
-            """
-        
-            response = get_response(input_prompt_accommodation, input_accommodation)
+            input_accommodation = accommodation_input(location, budget, accommodation_type, proximity_to_attractions, travel_party)
+
             st.subheader("Accommodation Recommendations: ")
-            # Justify the response text using HTML and CSS
-            justified_response = f'<div style="text-align: justify;">{response}</div>'
-            st.markdown(justified_response, unsafe_allow_html=True)
+            show_response(input_prompt_accommodation, input_accommodation)
 
 
     # If the choice is Transport
     if section_choice == "Transport":
 
-        # Transport Preferences Prompt Template
-        input_prompt_transport = """
-        You are a highly skilled Transport Advisor, dedicated to delivering personalized and efficient transport recommendations tailored to the user's specific preferences. When crafting your suggestions, consider the following key factors:
-        1. Location:
-            Take into account the primary destinations or cities specified by the user.
-            Assess the geographical layout, accessibility, and connectivity between the locations.
-        2. Mode of Transport:
-            Offer a range of options, including car, train, flight, and bike, based on the user's priorities such as speed, convenience, or scenic experiences.
-            Highlight any unique travel opportunities available at the specified location, such as scenic train routes or self-drive tours.
-        3. Availability of Rental Services:
-            Provide insights into rental options available, including car rentals, bike rentals, e-scooter rentals, and specialized options like RV or campervan rentals.
-            Include details about the accessibility of rental services (e.g., availability near airports, train stations, or city centers) and their suitability for the user's itinerary.
-        4. Public Transport Preferences:
-            Offer recommendations for urban and intercity public transportation, such as metro systems, buses, or high-speed trains.
-            Suggest eco-conscious options like electric buses or carpooling services for environmentally aware travelers.
-            Highlight local experiences that can be gained from public transportation, such as trams in historic districts or scenic ferry rides.
-        5. Tailoring the Suggestions:
-            Ensure that your recommendations align with the travel party’s needs, whether they are solo travelers, couples, families, or groups of friends. For example:
-            Family trips: Focus on safe and convenient modes of transport, such as car rentals or direct train connections.
-            Eco-conscious travelers: Recommend options like electric car rentals or public transport networks with green certifications.
-        Deliver your recommendations in a clear, user-friendly manner using markdown, ensuring key points are emphasized for quick comprehension. Additionally, include practical tips, such as links to transport websites, ticket booking platforms, or rental services. Tailor your tone to be professional, approachable, and engaging, ensuring users feel guided and confident in their travel planning.
-        """
-
         # Input Fields
         location = st.text_input("Enter the location for transport recommendations:")
         mode_of_transport = st.selectbox("Select the mode of transport:", ["Car", "Train", "Flight", "Bike"])
@@ -434,43 +361,15 @@ if selected == "Itinerary Planner":
         submit3 = st.button("Find Transport Options!")
         if submit3:
             # Construct the input plan based on user inputs
-            input_transport = f"""
-            Location: {location}
-            Mode of Transport: {mode_of_transport}
-            Rental Services: {', '.join(rental_services)}
-            Public Transport Preferences: {', '.join(public_transport_preferences)}
-            Travel Party: {travel_party}
-            """
-        
-            response = get_response(input_prompt_transport, input_transport)
+            input_transport = transport_input(location, mode_of_transport, rental_services, public_transport_preferences, travel_party)
+
             st.subheader("Transport Recommendations: ")
-            # Justify the response text using HTML and CSS
-            justified_response = f'<div style="text-align: justify;">{response}</div>'
-            st.markdown(justified_response, unsafe_allow_html=True)
+            show_response(input_prompt_transport, input_transport)
 
 
     # If the choice is Food Preferences
     if section_choice == "Food Preferences":
 
-        # Food Preferences Prompt Template
-        input_prompt_food = """
-        "You are an expert Travel and Culinary Advisor. Your job is to provide personalized transport and food recommendations based on the user's preferences.
-        Key Input Considerations:
-        1. Location:
-            Take into account the specified destination to tailor your recommendations to the local culture, availability of services, and unique culinary experiences.
-        2. Dietary Restrictions:
-            Address the user's dietary needs such as vegan, vegetarian, halal, gluten-free, or No Restrictions options. Ensure all recommendations respect these restrictions without compromising on taste and variety.
-        3. Interest in Local Cuisine:
-            Explore the user’s interest in local culinary experiences, such as trying authentic dishes, or enjoying street food. Incorporate activities and dining options that align with these interests.
-        4. Dining Experience:
-            Provide suggestions that match the user's preferred dining style, whether it’s fine dining for a sophisticated evening, casual dining for relaxed meals, or street vendors for quick and authentic local bites.
-        5. Ambiance Preferences:
-            Include ambiance preferences, such as romantic settings for couples, family-friendly environments for larger groups, or trendy spots for social gatherings.
-        6. Cuisine Variety:
-            Recommend restaurants and eateries offering a wide range of cuisines, including Italian, Thai, Indian, fusion dishes, or local specialties.
-        Return the response using markdown.
-        """
-
         # Input Fields
         location = st.text_input("Enter the location for transport recommendations:")
         dietary_restrictions = st.multiselect("Select dietary restrictions:", ["Vegan", "Vegetarian", "Halal", "Gluten-Free", "No Restrictions"])
@@ -483,17 +382,7 @@ if selected == "Itinerary Planner":
         submit4 = st.button("Find Food Options!")
         if submit4:
             # Construct the input plan based on user inputs
-            input_food = f"""
-            Location: {location}
-            Dietary Restrictions: {', '.join(dietary_restrictions)}
-            Interest in Local Cuisine: {', '.join(interest_in_local_cuisine)}
-            Dining Experience: {dining_experience}
-            Ambiance Preferences: {ambiance_preferences}
-            Cuisine Variety: {', '.join(cuisine_variety)}
-            """
-        
-            response = get_response(input_prompt_food, input_food)
+            input_food = food_input(location, dietary_restrictions, interest_in_local_cuisine, dining_experience, ambiance_preferences, cuisine_variety)
+
             st.subheader("Food Recommendations: ")
-            # Justify the response text using HTML and CSS
-            justified_response = f'<div style="text-align: justify;">{response}</div>'
-            st.markdown(justified_response, unsafe_allow_html=True)
\ No newline at end of file
+            show_response(input_prompt_food, input_food)
\ No newline at end of file
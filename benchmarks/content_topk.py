@@ -0,0 +1,78 @@
+"""Benchmark the top-k content recommender against the original sort-based recommend().
+
+The shipped catalogue (artifacts/place_list.pkl) is always measured first, then a
+synthetic catalogue of each size in --sizes.
+
+Usage:
+    python -m benchmarks.content_topk [--sizes 1000 5000] [--queries 100]
+"""
+import argparse
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.content import ContentRecommender
+
+
+# Original implementation from app.py (full Python sort of the similarity row)
+def legacy_recommend(travel, similarity, place):
+    if place not in travel['city'].values:
+        return []
+    index = travel[travel['city'] == place].index[0]
+    distances = sorted(list(enumerate(similarity[index])), reverse=True, key=lambda x: x[1])
+    return [travel.iloc[i[0]].city for i in distances[1:7]]
+
+
+def synthetic_catalogue(n, seed=0):
+    rng = np.random.default_rng(seed)
+    travel = pd.DataFrame({'c_id': np.arange(1, n + 1), 'city': [f"City {i}" for i in range(n)]})
+    vectors = rng.random((n, 32))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return travel, vectors @ vectors.T
+
+
+def time_queries(fn, places):
+    start_time = time.perf_counter()
+    for place in places:
+        fn(place)
+    return (time.perf_counter() - start_time) / len(places)
+
+
+def run(travel, similarity, n_queries, label):
+    rng = np.random.default_rng(1)
+    places = rng.choice(travel['city'].to_numpy(), size=n_queries).tolist()
+    engine = ContentRecommender(travel, similarity)
+
+    legacy = time_queries(lambda p: legacy_recommend(travel, similarity, p), places)
+    topk = time_queries(engine.recommend, places)
+    start_time = time.perf_counter()
+    engine.recommend_batch(places)
+    batch = (time.perf_counter() - start_time) / len(places)
+
+    print(
+        f"{label:>12}  legacy {legacy * 1e3:8.3f} ms  top-k {topk * 1e3:8.3f} ms  "
+        f"batch {batch * 1e3:8.3f} ms/query  speed-up x{legacy / topk:6.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='*', default=[1000, 5000], help="synthetic catalogue sizes")
+    parser.add_argument('--queries', type=int, default=100)
+    args = parser.parse_args()
+
+    with open('artifacts/place_list.pkl', 'rb') as f:
+        travel = pickle.load(f)
+    with open('artifacts/similarity.pkl', 'rb') as f:
+        similarity = pickle.load(f)
+    run(travel, similarity, args.queries, f"N={len(travel)}")
+
+    for n in args.sizes:
+        travel, similarity = synthetic_catalogue(n)
+        run(travel, similarity, args.queries, f"N={n}")
+
+
+if __name__ == '__main__':
+    main()
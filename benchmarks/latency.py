@@ -0,0 +1,184 @@
+"""Latency and memory benchmarks for the Travel Recommendation page on synthetic catalogues.
+
+Each case is timed call by call and reported as p50/p95/p99. Peak memory is the
+tracemalloc peak of one extra call. Cases:
+    load             cold artifact load + engine build (registry, content, collaborative, links)
+    recommend        content based recommendations for one city
+    recommend_city   collaborative recommendations for one city
+    recommend_user   per-user recommendations from one user's ratings
+    city_metadata    URL/info cards for one recommendation grid
+    render           full Travel Recommendation rerun (select a city, click the button)
+
+Usage:
+    python -m benchmarks.latency [--sizes 1000 10000 100000] [--queries 200] [--json out.json]
+    python -m benchmarks.latency --baseline out.json --tolerance 0.2   # exit 1 on a p95 regression
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+
+from benchmarks.synthetic import write_catalogue
+from src.artifacts import ArtifactRegistry
+from src.city_meta import CityMetadata
+from src.engine import RecommendationEngine
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+
+# Runs app.py on the Travel Recommendation page (the option menu needs a browser to pick a page)
+RENDER_SCRIPT = """
+import runpy
+import streamlit_option_menu
+streamlit_option_menu.option_menu = lambda *args, **kwargs: "Travel Recommendation"
+runpy.run_path({app!r}, run_name="__main__")
+"""
+
+
+@contextmanager
+def working_directory(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+# Function to time fn once per argument and measure the peak memory of one more call
+def measure(fn, args):
+    timings = []
+    for arg in args:
+        start_time = time.perf_counter()
+        fn(arg)
+        timings.append(time.perf_counter() - start_time)
+
+    tracemalloc.start()
+    fn(args[0])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings = np.asarray(timings) * 1e3
+    return {
+        'n': len(timings),
+        'mean_ms': float(timings.mean()),
+        'p50_ms': float(np.percentile(timings, 50)),
+        'p95_ms': float(np.percentile(timings, 95)),
+        'p99_ms': float(np.percentile(timings, 99)),
+        'peak_mb': peak / 2**20,
+    }
+
+
+def load_engine(root, content_index):
+    registry = ArtifactRegistry(root=root)
+    engine = RecommendationEngine(registry, content_index).warm_up()
+    registry.derived('city_metadata', CityMetadata, 'links')
+    return engine
+
+
+def render_app(root, content_index, cities):
+    from streamlit.testing.v1 import AppTest
+
+    os.environ['CONTENT_INDEX'] = content_index
+    with working_directory(root):
+        app = AppTest.from_string(RENDER_SCRIPT.format(app=APP), default_timeout=300)
+        app.run()
+
+        def render(city):
+            app.selectbox[0].set_value(city)
+            app.button[0].click().run()
+            if app.exception:
+                raise RuntimeError(app.exception[0].message)
+
+        return measure(render, cities)
+
+
+# Function to run every case against one catalogue; returns {case: stats}
+def run_catalogue(root, n_queries, load_repeats, render_queries, seed=1):
+    content_index = 'dense' if os.path.exists(os.path.join(root, 'artifacts', 'similarity.pkl')) else 'sparse'
+    engine = load_engine(root, content_index)
+    place_list = engine.place_list()
+    rng = np.random.default_rng(seed)
+    cities = rng.choice(place_list, size=n_queries).tolist()
+    users = rng.choice(list(engine.personal.user_index), size=n_queries).tolist()
+    city_metadata = engine.registry.derived('city_metadata', CityMetadata, 'links')
+    grids = [engine.recommend_all(city)['recommendations'] for city in cities]
+
+    results = {
+        'load': measure(lambda _: load_engine(root, content_index), [None] * load_repeats),
+        f'recommend[{content_index}]': measure(engine.recommend, cities),
+        'recommend_city': measure(engine.recommend_city, cities),
+        'recommend_user': measure(engine.recommend_user, users),
+        'city_metadata': measure(city_metadata.get_city_cards, grids),
+    }
+    if render_queries:
+        results['render'] = render_app(root, content_index, cities[:render_queries])
+    return results
+
+
+def print_results(label, results):
+    print(f"\n{label}")
+    print(f"  {'case':<20}{'n':>6}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'peak MB':>10}")
+    for case, stats in results.items():
+        print(
+            f"  {case:<20}{stats['n']:>6}{stats['p50_ms']:>11.3f}{stats['p95_ms']:>11.3f}"
+            f"{stats['p99_ms']:>11.3f}{stats['peak_mb']:>10.1f}"
+        )
+
+
+# Function to list every case whose p95 grew by more than tolerance over the baseline
+def regressions(results, baseline, tolerance):
+    found = []
+    for size, cases in results.items():
+        for case, stats in cases.items():
+            before = baseline.get(size, {}).get(case)
+            if before and stats['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+                found.append(f"{size} {case}: p95 {before['p95_ms']:.3f} -> {stats['p95_ms']:.3f} ms")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recommendation latency and memory benchmarks")
+    parser.add_argument('--sizes', type=int, nargs='*', default=[1000, 10000, 100000], help="cities (and users) per catalogue")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--load-repeats', type=int, default=3)
+    parser.add_argument('--render-queries', type=int, default=20, help="0 skips the Streamlit render case")
+    parser.add_argument('--data-dir', help="keep catalogues here and reuse them between runs")
+    parser.add_argument('--json', help="write the results to this file")
+    parser.add_argument('--baseline', help="results file of an earlier run to compare p95 against")
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            root = os.path.join(args.data_dir or tmp, f"catalogue-{n}")
+            if not os.path.exists(os.path.join(root, 'Data', 'Links.xlsx')):
+                start_time = time.perf_counter()
+                write_catalogue(root, n)
+                print(f"Generated {n} cities in {time.perf_counter() - start_time:.1f} seconds")
+            results[str(n)] = run_catalogue(root, args.queries, args.load_repeats, args.render_queries)
+            print_results(f"N={n}", results[str(n)])
+
+    print(f"\nProcess peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Write a synthetic catalogue (cities, tags, users, ratings, links) laid out like the repo.
+
+The output directory gets artifacts/ and Data/Links.xlsx (plus its Data/store copy), so ArtifactRegistry(root=out)
+and the Streamlit app (run from out) read it exactly like the real artifacts.
+
+Usage:
+    python -m benchmarks.synthetic --cities 10000 --users 10000 --out /tmp/catalogue-10k
+"""
+import argparse
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from src.collaborative import SparseKNN, SparseRatings, build_neighbour_table
+from src.datastore import DataStore
+
+COUNTRIES = ['India', 'Italy', 'France', 'Japan', 'Brazil', 'Canada', 'Kenya', 'Spain', 'Peru', 'Vietnam']
+
+
+# Function to generate normalized tag vectors: each city gets a few tags out of a fixed vocabulary
+def tag_vectors(n_cities, vocabulary=5000, tags_per_city=20, rng=None):
+    rng = rng or np.random.default_rng(0)
+    rows = np.repeat(np.arange(n_cities), tags_per_city)
+    cols = rng.zipf(1.3, size=n_cities * tags_per_city) % vocabulary
+    vectors = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n_cities, vocabulary))
+    norms = np.sqrt(np.asarray(vectors.multiply(vectors).sum(axis=1)).ravel())
+    return sparse.diags(1 / np.maximum(norms, 1e-12)) @ vectors
+
+
+# Function to generate (City, User ID, Travel Rating) rows with a skewed city popularity
+def ratings(cities, n_users, ratings_per_user=10, rng=None):
+    rng = rng or np.random.default_rng(0)
+    n = n_users * ratings_per_user
+    city_rows = (rng.zipf(1.5, size=n) - 1) % len(cities)
+    return pd.DataFrame({
+        'City': cities[city_rows],
+        'User ID': np.repeat([f"U{i}" for i in range(n_users)], ratings_per_user),
+        'Travel Rating': rng.integers(1, 6, size=n).astype(np.float64),
+    })
+
+
+def links(cities, rng=None):
+    rng = rng or np.random.default_rng(0)
+    return pd.DataFrame({
+        'City': cities,
+        'URL': [f"https://example.org/{i}" for i in range(len(cities))],
+        'Country': rng.choice(COUNTRIES, size=len(cities)),
+        'Population': rng.integers(1_000, 10_000_000, size=len(cities)),
+        'Area (sq mi)': np.round(rng.uniform(5, 500, size=len(cities)), 1),
+    })
+
+
+# Function to write every artifact the Travel Recommendation page needs under out
+def write_catalogue(out, n_cities, n_users=None, k=20, dense_max=2000, table_max=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    n_users = n_users or n_cities
+    os.makedirs(os.path.join(out, 'artifacts'), exist_ok=True)
+    os.makedirs(os.path.join(out, 'Data'), exist_ok=True)
+
+    cities = np.array([f"City {i}" for i in range(n_cities)], dtype=object)
+    travel = pd.DataFrame({'c_id': np.arange(1, n_cities + 1), 'city': cities})
+    with open(os.path.join(out, 'artifacts', 'place_list.pkl'), 'wb') as f:
+        pickle.dump(travel, f)
+    with open(os.path.join(out, 'artifacts', 'city_name.pkl'), 'wb') as f:
+        pickle.dump(pd.Index(cities, name='City'), f)
+
+    vectors = tag_vectors(n_cities, rng=rng)
+    sparse.save_npz(os.path.join(out, 'artifacts', 'content_vectors.npz'), vectors)
+    if n_cities <= dense_max:
+        with open(os.path.join(out, 'artifacts', 'similarity.pkl'), 'wb') as f:
+            pickle.dump((vectors @ vectors.T).toarray(), f)
+
+    # Every city gets one rating so it has a row in the ratings matrix
+    final_rating = pd.concat([
+        ratings(cities, n_users, rng=rng),
+        pd.DataFrame({'City': cities, 'User ID': 'U0', 'Travel Rating': 3.0}),
+    ], ignore_index=True)
+    city_ratings = SparseRatings.from_triplets(final_rating)
+    np.savez(os.path.join(out, 'artifacts', 'city_ratings.npz'), **city_ratings.to_arrays())
+    # The neighbour table is an all-pairs kNN; larger catalogues are served by live kNN instead
+    if n_cities <= table_max:
+        table = build_neighbour_table(SparseKNN(city_ratings.matrix, batch_size=256), city_ratings, k)
+        np.savez(os.path.join(out, 'artifacts', 'city_neighbours.npz'), **table.to_arrays())
+
+    links(cities, rng=rng).to_excel(os.path.join(out, 'Data', 'Links.xlsx'), index=False)
+    # The app reads Links.xlsx through its Parquet copy, as after ingest-data
+    DataStore(out).ingest('links')
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic catalogue for the benchmarks")
+    parser.add_argument('--cities', type=int, default=1000)
+    parser.add_argument('--users', type=int, default=None, help="defaults to the number of cities")
+    parser.add_argument('--out', required=True)
+    parser.add_argument('--dense-max', type=int, default=2000, help="largest catalogue that also gets similarity.pkl")
+    parser.add_argument('--table-max', type=int, default=20000, help="largest catalogue that also gets city_neighbours.npz")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    write_catalogue(args.out, args.cities, args.users, dense_max=args.dense_max, table_max=args.table_max)
+    print(f"Wrote {args.cities} cities to {args.out} in {time.perf_counter() - start_time:.1f} seconds")
+
+
+if __name__ == '__main__':
+    main()
@@ -7,7 +7,7 @@ with open("README.md", "r", encoding = "utf-8") as f:
 REPO_NAME = "Travel-Recommendation-System"
 AUTHOR_USER_NAME = "Sania"
 SRC_REPO = "src"
-LIST_OF_REQUIREMENTS = ['streamlit', 'numpy']
+LIST_OF_REQUIREMENTS = ['streamlit>=1.45', 'numpy', 'pandas', 'scipy', 'scikit-learn', 'nltk', 'openpyxl', 'pyarrow']
 
 
 setup(
@@ -21,5 +21,13 @@ setup(
     packages = [SRC_REPO],
     license = "MIT",
     python_requries = ">=3.7",
-    install_requires = LIST_OF_REQUIREMENTS
+    install_requires = LIST_OF_REQUIREMENTS,
+    entry_points = {
+        "console_scripts": [
+            "build-artifacts = src.pipeline:main",
+            "recommend-service = src.service:main",
+            "update-artifacts = src.incremental:main",
+            "ingest-data = src.datastore:main",
+        ],
+    },
 )
\ No newline at end of file
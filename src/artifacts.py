@@ -0,0 +1,379 @@
+import hashlib
+import logging
+import os
+import pickle
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from src import metrics
+
+logger = logging.getLogger(__name__)
+
+ARTIFACTS_DIR = "artifacts"
+
+# Lock file that orders multi-file artifact updates against readers in every process
+LOCK_PATH = "artifacts/.lock"
+
+# Artifacts used by the Travel Recommendation page (name -> (path, loader))
+DEFAULT_ARTIFACTS = {
+    "place_list": ("artifacts/place_list.pkl", "pickle"),
+    "similarity": ("artifacts/similarity.pkl", "pickle"),
+    "model": ("artifacts/model.pkl", "pickle"),
+    "city_name": ("artifacts/city_name.pkl", "pickle"),
+    "city_pivot": ("artifacts/city_pivot.pkl", "pickle"),
+    "final_rating": ("artifacts/final_rating.pkl", "pickle"),
+    "links": ("Data/Links.xlsx", "table"),
+    "content_vectors": ("artifacts/content_vectors.npz", "sparse"),
+    "content_neighbours": ("artifacts/content_neighbours.npz", "npz"),
+    "city_neighbours": ("artifacts/city_neighbours.npz", "npz"),
+    "city_ratings": ("artifacts/city_ratings.npz", "npz"),
+}
+
+# Same artifacts read from the memory-mapped export (python -m src.mmap_artifacts)
+MMAP_ARTIFACTS = dict(
+    DEFAULT_ARTIFACTS,
+    place_list=("artifacts/mmap/place_list.npy", "mmap"),
+    similarity=("artifacts/mmap/similarity.npy", "mmap"),
+    city_pivot=("artifacts/mmap/city_pivot.npy", "mmap"),
+    content_neighbours=("artifacts/mmap/content_neighbours.npy", "mmap"),
+    city_neighbours=("artifacts/mmap/city_neighbours.npy", "mmap"),
+)
+
+ARTIFACT_FORMATS = {
+    "pickle": DEFAULT_ARTIFACTS,
+    "mmap": MMAP_ARTIFACTS,
+}
+
+
+def load_pickle(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def load_excel(path):
+    return pd.read_excel(path)
+
+
+# Data/ sheets are read from their Parquet copy (ingest-data) when it is up to date
+def load_table(path):
+    from src.datastore import read_sheet
+
+    return read_sheet(path)
+
+
+def load_sparse(path):
+    from scipy import sparse
+
+    return sparse.load_npz(path)
+
+
+def load_npz(path):
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+
+def load_mmap(path):
+    from src.mmap_artifacts import load_mmap
+
+    return load_mmap(path)
+
+
+def mmap_digest(path):
+    from src.mmap_artifacts import manifest_digest
+
+    return manifest_digest(path)
+
+
+LOADERS = {
+    "pickle": load_pickle,
+    "excel": load_excel,
+    "table": load_table,
+    "sparse": load_sparse,
+    "npz": load_npz,
+    "mmap": load_mmap,
+}
+
+# Loaders whose files carry their own digest (hashing them would read every page)
+DIGESTS = {
+    "mmap": mmap_digest,
+}
+
+
+# Function to hash a file in chunks so large artifacts are not read at once
+def file_digest(path, chunk_size=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _is_mapped(array):
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = getattr(array, "base", None)
+    return False
+
+
+# Function to estimate how many bytes an artifact keeps resident in memory
+def resident_bytes(obj, _seen=None):
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        # Memory-mapped pages are shared through the OS page cache, not owned by this process
+        return 0 if _is_mapped(obj) else int(obj.nbytes)
+    if isinstance(obj, pd.DataFrame):
+        if len(obj.columns) and _is_mapped(obj.values):
+            return int(obj.index.memory_usage(deep=True) + obj.columns.memory_usage(deep=True))
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if hasattr(obj, "data") and hasattr(obj, "indices") and hasattr(obj, "indptr"):
+        # scipy.sparse compressed matrices
+        return int(obj.data.nbytes + obj.indices.nbytes + obj.indptr.nbytes)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(
+            resident_bytes(k, _seen) + resident_bytes(v, _seen) for k, v in obj.items()
+        )
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(resident_bytes(v, _seen) for v in obj)
+    if hasattr(obj, "__dict__"):
+        # Fitted estimators (e.g. NearestNeighbors) keep their arrays as attributes
+        return sys.getsizeof(obj) + resident_bytes(vars(obj), _seen)
+    return sys.getsizeof(obj)
+
+
+class ArtifactLock:
+    """Reader/writer lock on LOCK_PATH, shared by every process that uses the same artifacts.
+
+    Readers hold it shared while they read several related artifacts; publish() holds it
+    exclusively while it swaps a set of files, so readers see all old or all new files.
+    Without fcntl (Windows) or a writable artifacts/ directory it does nothing."""
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+        self._readers = 0
+        self._mutex = threading.Lock()
+
+    def _open(self):
+        if self._fd is None:
+            try:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            except OSError:
+                self._fd = -1
+        return self._fd
+
+    @contextmanager
+    def shared(self):
+        try:
+            import fcntl
+        except ImportError:
+            yield
+            return
+        # flock is held per open file, so threads of this process share one shared lock
+        with self._mutex:
+            fd = self._open()
+            if self._readers == 0 and fd >= 0:
+                fcntl.flock(fd, fcntl.LOCK_SH)
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._mutex:
+                self._readers -= 1
+                if self._readers == 0 and fd >= 0:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+
+    @contextmanager
+    def exclusive(self):
+        try:
+            import fcntl
+        except ImportError:
+            yield
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+
+# Function to move staged files ({final path: staged path}) into place as one update.
+# after_swap runs while the lock is still held (e.g. to re-export artifacts/mmap).
+def publish(staged, root=".", after_swap=None):
+    with ArtifactLock(os.path.join(root, LOCK_PATH)).exclusive():
+        for path, staged_path in staged.items():
+            os.replace(staged_path, path)
+        if after_swap is not None:
+            after_swap()
+    logger.info("Published %d artifacts: %s", len(staged), ", ".join(sorted(os.path.basename(p) for p in staged)))
+
+
+class _Entry:
+    def __init__(self, name, path, loader, digest):
+        self.name = name
+        self.path = path
+        self.loader = loader
+        self.digest_fn = digest
+        self.value = None
+        self.loaded = False
+        self.signature = None  # (mtime_ns, size) of the file when last checked
+        self.digest = None
+        self.load_seconds = 0.0
+        self.bytes = 0
+        self.loads = 0
+        self.loaded_at = None
+        self.lock = threading.Lock()
+
+
+class ArtifactRegistry:
+    """Process-wide store that loads each artifact once and reloads it only when
+    the file on disk changes (mtime/size first, then content hash)."""
+
+    def __init__(self, artifacts=None, root="."):
+        self.root = root
+        self._entries = {}
+        self._derived = {}
+        self._lock = threading.Lock()
+        self.artifact_lock = ArtifactLock(os.path.join(root, LOCK_PATH))
+        for name, (path, loader) in (artifacts or DEFAULT_ARTIFACTS).items():
+            self.register(name, path, loader)
+
+    def register(self, name, path, loader="pickle", digest=None):
+        if isinstance(loader, str):
+            digest = digest or DIGESTS.get(loader)
+            loader = LOADERS[loader]
+        entry = _Entry(name, os.path.join(self.root, path), loader, digest or file_digest)
+        with self._lock:
+            self._entries[name] = entry
+
+    def path(self, name):
+        return self._entries[name].path
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def __getitem__(self, name):
+        return self.get(name)
+
+    def get(self, name):
+        try:
+            entry = self._entries[name]
+        except KeyError:
+            raise KeyError(f"Unknown artifact: {name}") from None
+
+        st = os.stat(entry.path)
+        signature = (st.st_mtime_ns, st.st_size)
+        if entry.loaded and entry.signature == signature:
+            metrics.count('cache_requests_total', cache='artifact', result='hit')
+            return entry.value
+
+        with entry.lock:
+            # Another thread may have reloaded it while we waited
+            if entry.loaded and entry.signature == signature:
+                return entry.value
+            digest = entry.digest_fn(entry.path)
+            if entry.loaded and entry.digest == digest:
+                # File was touched but the contents are the same
+                entry.signature = signature
+                metrics.count('cache_requests_total', cache='artifact', result='hit')
+                return entry.value
+            metrics.count('cache_requests_total', cache='artifact', result='miss')
+            self._load(entry, signature, digest)
+            return entry.value
+
+    def _load(self, entry, signature, digest):
+        start_time = time.perf_counter()
+        value = entry.loader(entry.path)
+        elapsed_time = time.perf_counter() - start_time
+        metrics.observe('artifact_load_seconds', elapsed_time, artifact=entry.name)
+
+        entry.value = value
+        entry.loaded = True
+        entry.signature = signature
+        entry.digest = digest
+        entry.load_seconds = elapsed_time
+        entry.bytes = resident_bytes(value)
+        entry.loads += 1
+        entry.loaded_at = time.time()
+        logger.info(
+            "Loaded artifact %s from %s in %.4f seconds (%d bytes resident)",
+            entry.name, entry.path, elapsed_time, entry.bytes,
+        )
+
+    # Function to build (and cache) an object computed from one or more artifacts.
+    # It is rebuilt only when one of the artifacts it depends on is reloaded.
+    def derived(self, key, factory, *names):
+        # Read the artifacts together so an update published meanwhile is seen whole or not at all
+        with self.artifact_lock.shared():
+            values = [self.get(n) for n in names]
+            stamp = tuple(self._entries[n].digest for n in names)
+        with self._lock:
+            cached = self._derived.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        value = factory(*values)
+        with self._lock:
+            self._derived[key] = (stamp, value)
+        return value
+
+    def load_all(self):
+        return {name: self.get(name) for name in list(self._entries)}
+
+    def invalidate(self, name=None):
+        names = [name] if name is not None else list(self._entries)
+        for n in names:
+            entry = self._entries[n]
+            with entry.lock:
+                entry.loaded = False
+                entry.value = None
+                entry.signature = None
+                entry.digest = None
+        with self._lock:
+            self._derived.clear()
+
+    def stats(self):
+        return [
+            {
+                "name": e.name,
+                "path": e.path,
+                "loaded": e.loaded,
+                "load_seconds": e.load_seconds,
+                "bytes": e.bytes,
+                "loads": e.loads,
+                "loaded_at": e.loaded_at,
+                "digest": e.digest,
+            }
+            for e in self._entries.values()
+        ]
+
+
+_registries = {}
+_registry_lock = threading.Lock()
+
+
+# Function to get the module-level registry shared by every session in the process.
+# fmt is 'pickle' (default) or 'mmap' for the memory-mapped export.
+def get_registry(fmt="pickle"):
+    if fmt not in ARTIFACT_FORMATS:
+        raise ValueError(f"Unknown artifact format: {fmt} (expected one of {sorted(ARTIFACT_FORMATS)})")
+    registry = _registries.get(fmt)
+    if registry is None:
+        with _registry_lock:
+            registry = _registries.get(fmt)
+            if registry is None:
+                registry = _registries[fmt] = ArtifactRegistry(ARTIFACT_FORMATS[fmt])
+    return registry
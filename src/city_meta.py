@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from src import metrics
+
+INFO_COLUMNS = ['Country', 'Population', 'Area (sq mi)']
+
+
+class CityMetadata:
+    """Links.xlsx parsed once into a City-indexed table for the results grid."""
+
+    def __init__(self, links_data):
+        # First row wins for duplicated cities, like match.iloc[0] did
+        frame = links_data.drop_duplicates('City', keep='first')
+        self.index = pd.Index(frame['City'].to_numpy())
+        self.url = frame['URL'].to_numpy(dtype=object)
+        self.country = frame['Country'].astype('category')
+        # Population mixes numbers ("32000") and text ("20 million"); keep the text form
+        self.population = frame['Population'].astype(str).to_numpy(dtype=object)
+        self.area = frame['Area (sq mi)'].to_numpy(dtype=np.float64)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, city):
+        return city in self.index
+
+    # Function to get URL, Country, Population and Area for many cities in one lookup.
+    # Cities without a Links.xlsx row get URL '#' and info None.
+    @metrics.timed('city_cards_seconds')
+    def get_city_cards(self, cities):
+        positions = self.index.get_indexer(list(cities))
+        found = positions >= 0
+        safe = np.where(found, positions, 0)
+        urls = self.url[safe]
+        countries = self.country.to_numpy()[safe]
+        populations = self.population[safe]
+        areas = self.area[safe]
+
+        cards = []
+        for i, city in enumerate(cities):
+            if not found[i]:
+                cards.append({'City': city, 'URL': '#', 'info': None})
+                continue
+            cards.append({
+                'City': city,
+                'URL': urls[i],
+                'info': {
+                    'Country': countries[i],
+                    'Population': populations[i],
+                    'Area (sq mi)': areas[i],
+                },
+            })
+        return cards
+
+    def get_city_url(self, city):
+        return self.get_city_cards([city])[0]['URL']
+
+    def get_city_info(self, city):
+        return self.get_city_cards([city])[0]['info']
@@ -0,0 +1,250 @@
+import argparse
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix, csr_matrix
+
+from src import metrics
+
+logger = logging.getLogger(__name__)
+
+# Extra neighbours fetched by live kNN queries before the stable re-ordering
+LIVE_OVERFETCH = 10
+
+
+class SparseRatings:
+    """City x User ratings kept as CSR, built straight from (city, user, rating)
+    triplets. Memory grows with the number of ratings, not cities x users."""
+
+    def __init__(self, matrix, cities, users):
+        self.matrix = csr_matrix(matrix)
+        self.index = pd.Index(np.asarray(cities), name='City')
+        self.columns = pd.Index(np.asarray(users), name='User ID')
+
+    # Function to build the matrix from final_rating; duplicate (city, user) pairs are
+    # averaged and labels are sorted, exactly like pivot_table(...).fillna(0)
+    @classmethod
+    def from_triplets(cls, final_rating, city='City', user='User ID', rating='Travel Rating'):
+        triplets = final_rating.groupby([city, user], sort=False, observed=True)[rating].mean().reset_index()
+        city_codes, cities = pd.factorize(triplets[city], sort=True)
+        user_codes, users = pd.factorize(triplets[user], sort=True)
+        matrix = coo_matrix(
+            (triplets[rating].to_numpy(dtype=np.float64), (city_codes, user_codes)),
+            shape=(len(cities), len(users)),
+        )
+        return cls(matrix.tocsr(), cities, users)
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        shape = tuple(arrays['shape'])
+        matrix = csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']), shape=shape)
+        return cls(matrix, arrays['cities'], arrays['users'])
+
+    def to_arrays(self):
+        return {
+            'data': self.matrix.data, 'indices': self.matrix.indices, 'indptr': self.matrix.indptr,
+            'shape': np.asarray(self.matrix.shape), 'cities': self.index.to_numpy().astype(str),
+            'users': self.columns.to_numpy().astype(str),
+        }
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @property
+    def nbytes(self):
+        return self.matrix.data.nbytes + self.matrix.indices.nbytes + self.matrix.indptr.nbytes
+
+    def to_frame(self):
+        return pd.DataFrame(self.matrix.toarray(), index=self.index, columns=self.columns)
+
+
+class SparseKNN:
+    """Brute-force euclidean kNN over CSR rows, with the same kneighbors() call as
+    NearestNeighbors(algorithm='brute'). Distances come from sparse dot products:
+    |a - b|^2 = |a|^2 + |b|^2 - 2 a.b, computed batch_size queries at a time."""
+
+    def __init__(self, matrix, batch_size=1024):
+        self.matrix = csr_matrix(matrix)
+        self.batch_size = batch_size
+        self.sq_norms = np.asarray(self.matrix.multiply(self.matrix).sum(axis=1)).ravel()
+
+    def kneighbors(self, X, n_neighbors=5):
+        X = csr_matrix(X)
+        n = self.matrix.shape[0]
+        n_neighbors = min(n_neighbors, n)
+        distances = np.empty((X.shape[0], n_neighbors))
+        indices = np.empty((X.shape[0], n_neighbors), dtype=np.intp)
+        x_sq = np.asarray(X.multiply(X).sum(axis=1)).ravel()
+
+        for start in range(0, X.shape[0], self.batch_size):
+            stop = min(start + self.batch_size, X.shape[0])
+            dot = (X[start:stop] @ self.matrix.T).toarray()
+            sq = np.maximum(x_sq[start:stop, None] + self.sq_norms[None, :] - 2 * dot, 0)
+            if n_neighbors < n:
+                part = np.argpartition(sq, n_neighbors - 1, axis=1)[:, :n_neighbors]
+            else:
+                part = np.tile(np.arange(n), (stop - start, 1))
+            part_sq = np.take_along_axis(sq, part, axis=1)
+            order = np.argsort(part_sq, axis=1, kind='stable')
+            indices[start:stop] = np.take_along_axis(part, order, axis=1)
+            distances[start:stop] = np.sqrt(np.take_along_axis(part_sq, order, axis=1))
+        return distances, indices
+
+
+class CityNeighbours:
+    """Precomputed city -> top-K neighbours (with kNN distances) for every city in city_pivot."""
+
+    def __init__(self, cities, indices, distances):
+        self.cities = np.asarray(cities)
+        self.indices = np.asarray(indices)
+        self.distances = np.asarray(distances)
+        self.city_index = {city: i for i, city in enumerate(self.cities.tolist())}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays['cities'], arrays['indices'], arrays['distances'])
+
+    def to_arrays(self):
+        return {'cities': self.cities.astype(str), 'indices': self.indices, 'distances': self.distances}
+
+    @property
+    def k(self):
+        return self.indices.shape[1]
+
+    def __contains__(self, city):
+        return city in self.city_index
+
+    def lookup(self, city, n_neighbors=6):
+        row = self.city_index[city]
+        indices = self.indices[row, :n_neighbors]
+        return self.cities[indices].tolist(), self.distances[row, :n_neighbors].tolist()
+
+
+# Function to order kNN results by distance, breaking ties by row position, so the
+# batched table and single live queries list equally distant cities the same way
+def stable_order(distances, indices):
+    order = np.lexsort((indices, np.round(distances, 9)), axis=1)
+    return np.take_along_axis(distances, order, axis=1), np.take_along_axis(indices, order, axis=1)
+
+
+def _rows(city_pivot, rows=None):
+    if isinstance(city_pivot, SparseRatings):
+        return city_pivot.matrix if rows is None else city_pivot.matrix[rows]
+    values = city_pivot.to_numpy()
+    return csr_matrix(values if rows is None else values[rows])
+
+
+# Function to compute the neighbours of every city in one batched kneighbors call.
+# Over-fetches like the live path, so cities tied at the k-th distance are cut by row order.
+def build_neighbour_table(model, city_pivot, k=20):
+    k = min(k, len(city_pivot))
+    n_fetch = min(len(city_pivot), k + LIVE_OVERFETCH)
+    distances, indices = stable_order(*model.kneighbors(_rows(city_pivot), n_neighbors=n_fetch))
+    return CityNeighbours(
+        city_pivot.index.to_numpy().astype(str),
+        indices[:, :k].astype(np.int32),
+        distances[:, :k].astype(np.float64),
+    )
+
+
+class CollaborativeRecommender:
+    """Item-item kNN recommendations served from the neighbour table, with live
+    kNN only for cities added to city_pivot after the table was built.
+
+    city_pivot is either the dense DataFrame with its fitted NearestNeighbors model,
+    or SparseRatings with a SparseKNN over the same matrix."""
+
+    def __init__(self, city_pivot, model, table=None):
+        self.city_pivot = city_pivot
+        self.model = model
+        self.table = table
+        self.city_index = {city: i for i, city in enumerate(city_pivot.index.tolist())}
+
+    def __contains__(self, city):
+        return city in self.city_index
+
+    # Function to get (cities, distances); the nearest neighbour is the city itself
+    def recommend_with_distances(self, city, n_neighbors=6):
+        return self.recommend_batch_with_distances([city], n_neighbors)[0]
+
+    def recommend(self, city, n_neighbors=6):
+        return self.recommend_with_distances(city, n_neighbors)[0]
+
+    # Function to answer many cities: table lookups, plus one kneighbors call for
+    # every city the table does not cover. Unknown cities get empty lists.
+    @metrics.timed('recommend_seconds', recommender='collaborative')
+    def recommend_batch_with_distances(self, cities, n_neighbors=6):
+        results = [([], []) for _ in cities]
+        live = []
+        for i, city in enumerate(cities):
+            if city not in self.city_index:
+                continue
+            if self.table is not None and city in self.table and n_neighbors <= self.table.k:
+                results[i] = self.table.lookup(city, n_neighbors)
+            else:
+                live.append(i)
+        if self.table is not None:
+            metrics.count('cache_requests_total', len(live), cache='city_neighbours', result='miss')
+            metrics.count('cache_requests_total', len(cities) - len(live), cache='city_neighbours', result='hit')
+
+        if live:
+            logger.debug("Live kNN for %d cities not in the neighbour table", len(live))
+            # Over-fetch a little so cities tied at the cut-off are picked by row position too
+            rows = [self.city_index[cities[i]] for i in live]
+            n_fetch = min(len(self.city_pivot), n_neighbors + LIVE_OVERFETCH)
+            with metrics.timed('knn_query_seconds'):
+                distance, suggestion = stable_order(*self.model.kneighbors(
+                    _rows(self.city_pivot, rows), n_neighbors=n_fetch
+                ))
+            labels = self.city_pivot.index
+            for j, i in enumerate(live):
+                results[i] = (labels[suggestion[j, :n_neighbors]].tolist(), distance[j, :n_neighbors].tolist())
+        return results
+
+    def recommend_batch(self, cities, n_neighbors=6):
+        return [names for names, _ in self.recommend_batch_with_distances(cities, n_neighbors)]
+
+
+def sparse_engine(ratings, table=None):
+    ratings = SparseRatings.from_arrays(ratings)
+    table = CityNeighbours.from_arrays(table) if table is not None else None
+    return CollaborativeRecommender(ratings, SparseKNN(ratings.matrix), table)
+
+
+# Function to get the collaborative engine from the artifact registry.
+# The sparse ratings (city_ratings.npz) are preferred over city_pivot.pkl + model.pkl.
+def load_engine(registry):
+    has_table = os.path.exists(registry.path('city_neighbours'))
+    if 'city_ratings' in registry and os.path.exists(registry.path('city_ratings')):
+        if has_table:
+            return registry.derived('collaborative_engine:sparse', sparse_engine, 'city_ratings', 'city_neighbours')
+        return registry.derived('collaborative_engine:sparse_live', sparse_engine, 'city_ratings')
+    if has_table:
+        return registry.derived(
+            'collaborative_engine',
+            lambda city_pivot, model, table: CollaborativeRecommender(
+                city_pivot, model, CityNeighbours.from_arrays(table)
+            ),
+            'city_pivot', 'model', 'city_neighbours',
+        )
+    return registry.derived('collaborative_engine:live', CollaborativeRecommender, 'city_pivot', 'model')
+
+
+if __name__ == '__main__':
+    from src.artifacts import ArtifactRegistry
+
+    parser = argparse.ArgumentParser(description="Build the sparse ratings and the collaborative neighbour table from final_rating.pkl")
+    parser.add_argument('--out', default='artifacts/city_neighbours.npz')
+    parser.add_argument('--ratings-out', default='artifacts/city_ratings.npz')
+    parser.add_argument('-k', type=int, default=20, help="neighbours kept per city")
+    args = parser.parse_args()
+
+    registry = ArtifactRegistry()
+    ratings = SparseRatings.from_triplets(registry['final_rating'])
+    np.savez(args.ratings_out, **ratings.to_arrays())
+    table = build_neighbour_table(SparseKNN(ratings.matrix), ratings, args.k)
+    np.savez(args.out, **table.to_arrays())
+    print(f"Wrote {ratings.matrix.nnz} ratings ({ratings.nbytes} bytes) to {args.ratings_out}")
+    print(f"Wrote neighbours for {len(table.cities)} cities (k={table.k}) to {args.out}")
@@ -0,0 +1,234 @@
+import argparse
+import json
+import os
+
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+from src import metrics
+
+# Tag vocabulary in content_vectors.npz column order (read by src/incremental.py)
+VOCABULARY_PATH = 'artifacts/content_vocabulary.json'
+
+
+# Function to pick the k largest entries of every row without sorting the full rows.
+# Returns (indices, scores), both of shape (n_rows, k), ordered by descending score.
+# Scores equal after rounding to 1e-9 come in row order. The notebook's full sort
+# ordered them differently, so cities with tied scores may be listed (or cut at k)
+# differently than before.
+def top_k(scores, k, exclude=None):
+    # Rounded so that backends computing the same cosine in a different order tie identically
+    scores = np.round(np.asarray(scores, dtype=np.float64), 9)
+    if scores.ndim == 1:
+        scores = scores.reshape(1, -1)
+    n_rows, n_cols = scores.shape
+
+    if exclude is not None:
+        # Mask out the query itself (one column per row)
+        scores[np.arange(n_rows), np.asarray(exclude)] = -np.inf
+        n_cols_available = n_cols - 1
+    else:
+        n_cols_available = n_cols
+
+    k = max(0, min(k, n_cols_available))
+    if k == 0:
+        return np.empty((n_rows, 0), dtype=np.intp), np.empty((n_rows, 0))
+
+    # Score of the k-th best entry in each row (linear time, no full sort)
+    kth = -np.partition(-scores, k - 1, axis=1)[:, k - 1:k]
+    above = scores > kth
+    # Entries tied with the k-th best are taken in row order so results are deterministic
+    need = k - above.sum(axis=1, keepdims=True)
+    ties = scores == kth
+    selected = above | (ties & (np.cumsum(ties, axis=1) <= need))
+    candidates = np.nonzero(selected)[1].reshape(n_rows, k)
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+
+    # Sort only the k survivors: by score (desc), then by row position for stable ties
+    order = np.lexsort((candidates, -candidate_scores), axis=1)
+    indices = np.take_along_axis(candidates, order, axis=1)
+    return indices, np.take_along_axis(candidate_scores, order, axis=1)
+
+
+class DenseSimilarity:
+    """Backend over the precomputed dense N x N similarity matrix (similarity.pkl)."""
+
+    def __init__(self, matrix):
+        self.matrix = np.asarray(matrix)
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def top_k(self, rows, k):
+        return top_k(self.matrix[rows], k, exclude=rows)
+
+
+class SparseSimilarity:
+    """Backend that keeps only the L2-normalized sparse tag vectors (memory grows
+    with the number of non-zero tags) and computes cosine similarities on demand."""
+
+    def __init__(self, vectors):
+        vectors = sparse.csr_matrix(vectors, dtype=np.float64)
+        # Rows with no tags stay all-zero, exactly like cosine_similarity
+        self.vectors = normalize(vectors, norm='l2', axis=1)
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    def similarity_rows(self, rows):
+        return (self.vectors[rows] @ self.vectors.T).toarray()
+
+    def top_k(self, rows, k):
+        return top_k(self.similarity_rows(rows), k, exclude=rows)
+
+    # Function to precompute the top-k neighbours of every row, batch_size rows at a time
+    def neighbour_table(self, k=20, batch_size=1024):
+        n = len(self)
+        k = min(k, n - 1)
+        indices = np.empty((n, k), dtype=np.int32)
+        scores = np.empty((n, k), dtype=np.float32)
+        for start in range(0, n, batch_size):
+            rows = np.arange(start, min(start + batch_size, n))
+            idx, sc = self.top_k(rows, k)
+            indices[rows] = idx
+            scores[rows] = sc
+        return NeighbourTable(indices, scores)
+
+
+class NeighbourTable:
+    """Backend over a precomputed table of the top-K neighbours of every row.
+    Queries are a slice of the table, so k must not exceed K."""
+
+    def __init__(self, indices, scores):
+        self.indices = np.asarray(indices)
+        self.scores = np.asarray(scores)
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays['indices'], arrays['scores'])
+
+    def __len__(self):
+        return self.indices.shape[0]
+
+    def top_k(self, rows, k):
+        if k > self.indices.shape[1]:
+            raise ValueError(f"Neighbour table only holds {self.indices.shape[1]} neighbours, asked for {k}")
+        return self.indices[rows, :k].astype(np.intp), self.scores[rows, :k].astype(np.float64)
+
+
+# Function to build the sparse tag vectors the same way Content.ipynb does
+def vectorize_tags(tags, max_features=5000):
+    return fit_vectorizer(tags, max_features)[1]
+
+
+# Function to get (vocabulary, vectors); vocabulary lists the terms in column order
+def fit_vectorizer(tags, max_features=5000):
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    cv = CountVectorizer(max_features=max_features, stop_words='english')
+    vectors = cv.fit_transform(tags)
+    return cv.get_feature_names_out().tolist(), vectors
+
+
+def save_vocabulary(vocabulary, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(vocabulary, f)
+
+
+class ContentRecommender:
+    """Top-k content based recommendations over a similarity backend.
+
+    similarity may be the dense matrix from similarity.pkl or any backend above."""
+
+    def __init__(self, travel, similarity):
+        self.cities = travel['city'].to_numpy()
+        if not hasattr(similarity, 'top_k'):
+            similarity = DenseSimilarity(similarity)
+        self.similarity = similarity
+        # city -> row in the similarity matrix (first occurrence wins, like .index[0])
+        self.city_index = {}
+        for i, city in enumerate(self.cities):
+            self.city_index.setdefault(city, i)
+
+    def __contains__(self, place):
+        return place in self.city_index
+
+    def rows(self, places):
+        return [self.city_index.get(place) for place in places]
+
+    # Function to get (indices, scores) matrices for a batch of similarity rows
+    def top_k_rows(self, rows, k=6):
+        rows = np.asarray(rows, dtype=np.intp)
+        with metrics.timed('recommend_seconds', recommender='content', backend=type(self.similarity).__name__):
+            return self.similarity.top_k(rows, k)
+
+    def recommend_with_scores(self, place, k=6):
+        row = self.city_index.get(place)
+        if row is None:
+            return []
+        indices, scores = self.top_k_rows([row], k)
+        return list(zip(self.cities[indices[0]].tolist(), scores[0].tolist()))
+
+    def recommend(self, place, k=6):
+        return [city for city, _ in self.recommend_with_scores(place, k)]
+
+    # Function to get (cities, scores) for many places at once; unknown places get empty lists
+    def recommend_batch_with_scores(self, places, k=6):
+        rows = self.rows(places)
+        known = [i for i, row in enumerate(rows) if row is not None]
+        results = [([], []) for _ in places]
+        if known:
+            indices, scores = self.top_k_rows([rows[i] for i in known], k)
+            for j, i in enumerate(known):
+                results[i] = (self.cities[indices[j]].tolist(), scores[j].tolist())
+        return results
+
+    # Function to recommend for many places at once; unknown places get an empty list
+    def recommend_batch(self, places, k=6):
+        return [names for names, _ in self.recommend_batch_with_scores(places, k)]
+
+
+# Index modes for the Travel Recommendation page: mode -> (artifact, backend factory)
+INDEX_MODES = {
+    'dense': ('similarity', DenseSimilarity),
+    'sparse': ('content_vectors', SparseSimilarity),
+    'neighbours': ('content_neighbours', NeighbourTable.from_arrays),
+}
+
+
+# Function to get the content engine for an index mode from the artifact registry
+def load_engine(registry, mode='dense'):
+    if mode not in INDEX_MODES:
+        raise ValueError(f"Unknown content index mode: {mode} (expected one of {sorted(INDEX_MODES)})")
+    artifact, backend = INDEX_MODES[mode]
+    return registry.derived(
+        f'content_engine:{mode}',
+        lambda travel, data: ContentRecommender(travel, backend(data)),
+        'place_list', artifact,
+    )
+
+
+# Function to write the sparse vectors and the neighbour table next to the other artifacts
+def export_index(travel, out_dir='artifacts', k=20):
+    vocabulary, vectors = fit_vectorizer(travel['tags'])
+    index = SparseSimilarity(vectors)
+    table = index.neighbour_table(k)
+    sparse.save_npz(os.path.join(out_dir, 'content_vectors.npz'), index.vectors)
+    save_vocabulary(vocabulary, os.path.join(out_dir, os.path.basename(VOCABULARY_PATH)))
+    np.savez(os.path.join(out_dir, 'content_neighbours.npz'), indices=table.indices, scores=table.scores)
+    return index, table
+
+
+if __name__ == '__main__':
+    import pickle
+
+    parser = argparse.ArgumentParser(description="Build the sparse content index from place_list.pkl")
+    parser.add_argument('--out-dir', default='artifacts')
+    parser.add_argument('-k', type=int, default=20, help="neighbours kept per place")
+    args = parser.parse_args()
+
+    with open(os.path.join(args.out_dir, 'place_list.pkl'), 'rb') as f:
+        travel = pickle.load(f)
+    index, table = export_index(travel, args.out_dir, args.k)
+    print(f"Wrote {index.vectors.nnz} non-zeros for {len(index)} places and a {table.indices.shape} neighbour table")
@@ -0,0 +1,155 @@
+"""Columnar copies of the Data/*.xlsx sheets and the loader used to read them.
+
+ingest-data converts each sheet once into Data/store/<Sheet>.parquet with compact
+dtypes (categories for repeated labels, small ints for ratings), in row groups of
+CHUNK_ROWS rows. DataStore.read() loads only the requested columns. iter_chunks()
+streams a table one row group at a time, for rating logs too large for memory. A
+sheet whose Parquet copy is missing or older than the sheet is read from Excel (or
+re-ingested when refresh=True), so edits to Data/*.xlsx are never silently ignored.
+
+Usage:
+    ingest-data [--root .] [--tables content city user rating links]
+"""
+import argparse
+import logging
+import os
+import time
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = "Data"
+STORE_DIR = "Data/store"
+
+# Rows per Parquet row group, and per chunk of iter_chunks()
+CHUNK_ROWS = 100_000
+
+# Table -> (sheet in Data/, compact dtypes of its columns; other columns keep their type)
+TABLES = {
+    "content": ("Content.xlsx", {"c_id": "int32", "country": "category"}),
+    "city": ("City.xlsx", {"Country": "category", "Climate": "category"}),
+    "user": ("User.xlsx", {"Nationality": "category"}),
+    "rating": ("Rating.xlsx", {"User ID": "category", "City ID": "category", "City Name": "category", "Travel Rating": "int8"}),
+    "links": ("Links.xlsx", {"Country": "category"}),
+}
+
+
+# Function to give every column a single Parquet type: the compact dtypes above, and
+# text for object columns that mix numbers and strings (e.g. Population in Links.xlsx)
+def coerce(df, dtypes):
+    for col in df.columns:
+        dtype = dtypes.get(col)
+        if dtype is None:
+            if df[col].dtype == object:
+                df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+            continue
+        if dtype.startswith("int") and df[col].isna().any():
+            # Missing values need a float column
+            dtype = "float32"
+        df[col] = df[col].astype(dtype)
+    return df
+
+
+class DataStore:
+    """Reads the Data/ tables from their Parquet copies when those are up to date."""
+
+    def __init__(self, root=".", refresh=False):
+        self.root = root
+        self.refresh = refresh
+
+    def _table(self, name):
+        try:
+            return TABLES[name]
+        except KeyError:
+            raise KeyError(f"Unknown table: {name}") from None
+
+    def source(self, name):
+        return os.path.join(self.root, DATA_DIR, self._table(name)[0])
+
+    def path(self, name):
+        sheet = self._table(name)[0]
+        return os.path.join(self.root, STORE_DIR, os.path.splitext(sheet)[0] + ".parquet")
+
+    # Function to check the Parquet copy exists and is not older than its sheet
+    def is_fresh(self, name):
+        path, source = self.path(name), self.source(name)
+        if not os.path.exists(path):
+            return False
+        return not os.path.exists(source) or os.path.getmtime(path) >= os.path.getmtime(source)
+
+    # Function to convert one sheet into its Parquet copy
+    def ingest(self, name):
+        start_time = time.perf_counter()
+        df = coerce(pd.read_excel(self.source(name)), self._table(name)[1])
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        df.to_parquet(tmp_path, engine="pyarrow", index=False, row_group_size=CHUNK_ROWS)
+        os.replace(tmp_path, path)
+        logger.info("Ingested %s: %d rows in %.2f seconds", os.path.basename(self.source(name)), len(df), time.perf_counter() - start_time)
+        return df
+
+    def _parquet_ready(self, name):
+        if self.is_fresh(name):
+            return True
+        if self.refresh and os.path.exists(self.source(name)):
+            self.ingest(name)
+            return True
+        return False
+
+    # Function to load a table, or only the given columns of it
+    def read(self, name, columns=None):
+        columns = list(columns) if columns is not None else None
+        if self._parquet_ready(name):
+            return pd.read_parquet(self.path(name), engine="pyarrow", columns=columns)
+        logger.debug("No up-to-date Parquet copy of %s; reading the sheet", name)
+        df = pd.read_excel(self.source(name), usecols=columns)
+        return coerce(df if columns is None else df[columns], self._table(name)[1])
+
+    # Function to yield a table as DataFrames of at most rows rows (one row group each).
+    # Categories are per chunk; compare values, not category codes, across chunks.
+    def iter_chunks(self, name, columns=None, rows=CHUNK_ROWS):
+        columns = list(columns) if columns is not None else None
+        if not self._parquet_ready(name):
+            frame = self.read(name, columns)
+            for start in range(0, len(frame), rows):
+                yield frame.iloc[start:start + rows]
+            return
+
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(self.path(name)).iter_batches(batch_size=rows, columns=columns):
+            yield batch.to_pandas()
+
+
+# Function to read a Data/ sheet by path (the registry's 'table' loader); known sheets
+# come from their Parquet copy when it is up to date
+def read_sheet(path):
+    sheet = os.path.basename(path)
+    for name, (table_sheet, _) in TABLES.items():
+        if table_sheet == sheet:
+            root = os.path.dirname(os.path.dirname(os.path.abspath(path)))
+            return DataStore(root).read(name)
+    return pd.read_excel(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert Data/*.xlsx into Parquet copies under Data/store")
+    parser.add_argument("--root", default=".", help="project directory containing Data/")
+    parser.add_argument("--tables", nargs="*", choices=sorted(TABLES), help="only these tables (default: every sheet present)")
+    args = parser.parse_args(argv)
+
+    store = DataStore(args.root)
+    for name in args.tables or list(TABLES):
+        if not os.path.exists(store.source(name)):
+            print(f"{name:<8} skipped (no {os.path.basename(store.source(name))})")
+            continue
+        start_time = time.perf_counter()
+        df = store.ingest(name)
+        size = os.path.getsize(store.path(name))
+        print(f"{name:<8} {len(df):>9} rows  {size / 1024:>9.1f} KiB  {time.perf_counter() - start_time:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import os
+
+from src.artifacts import get_registry
+from src.collaborative import load_engine as load_collaborative_engine
+from src.content import load_engine as load_content_engine
+from src.hybrid import HybridRanker
+from src.personal import load_engine as load_personal_engine
+from src.search import CitySearchIndex
+
+# Neighbours asked from each recommender for one selected city
+N_RECOMMENDATIONS = 6
+
+
+# Function to validate city names
+def is_valid_city(city):
+    # Example criteria: names should be longer than one character
+    return len(city) > 1
+
+
+# Function to build the sorted list of every city the user can select
+def build_place_list(city_name, travel):
+    place_list = set(filter(is_valid_city, city_name))  # Filtered unique cities from city_name
+    place_list.update(filter(is_valid_city, travel['city'].values))  # Filtered unique cities from travel['city']
+    return sorted(place_list)
+
+
+class RecommendationEngine:
+    """Content based + collaborative (and per-user) recommendations, independent of the Streamlit UI.
+
+    Engines are looked up in the artifact registry on every call, so they follow
+    artifact reloads without restarting the process."""
+
+    def __init__(self, registry=None, content_index=None, ranker=None):
+        self.registry = registry or get_registry(os.getenv('ARTIFACT_FORMAT', 'pickle'))
+        self.content_index = content_index or os.getenv('CONTENT_INDEX', 'dense')
+        self.ranker = ranker or HybridRanker()
+
+    @property
+    def content(self):
+        return load_content_engine(self.registry, self.content_index)
+
+    @property
+    def collaborative(self):
+        return load_collaborative_engine(self.registry)
+
+    @property
+    def personal(self):
+        return load_personal_engine(self.registry)
+
+    def warm_up(self):
+        self.place_list()
+        self.search_index()
+        self.content
+        self.collaborative
+        self.personal
+        return self
+
+    def place_list(self):
+        return self.registry.derived('place_list_sorted', build_place_list, 'city_name', 'place_list')
+
+    def search_index(self):
+        return self.registry.derived(
+            'city_search', lambda city_name, travel: CitySearchIndex(build_place_list(city_name, travel)),
+            'city_name', 'place_list',
+        )
+
+    # Function to get ranked autocomplete suggestions for partly typed or misspelled input
+    def search(self, query, limit=10):
+        return self.search_index().search(query, limit)
+
+    # Function to map free text (any case, aliases, typos) to a city name, or None
+    def resolve(self, query):
+        return self.search_index().resolve(query)
+
+    # Content Based
+    def recommend(self, place, k=N_RECOMMENDATIONS):
+        return self.content.recommend(place, k=k)
+
+    # Collaborative Filtering
+    def recommend_city(self, city_name, n_neighbors=N_RECOMMENDATIONS):
+        return self.collaborative.recommend(city_name, n_neighbors=n_neighbors)
+
+    def recommend_all(self, selected_city, k=N_RECOMMENDATIONS):
+        return self.recommend_all_batch([selected_city], k)[0]
+
+    # Function to answer many selected cities with one vectorized call per recommender,
+    # plus one hybrid ranking pass over both candidate sets
+    def recommend_all_batch(self, cities, k=N_RECOMMENDATIONS, limit=None):
+        cities = list(cities)
+        content = self.content.recommend_batch_with_scores(cities, k=k)
+        collaborative = self.collaborative.recommend_batch_with_distances(cities, n_neighbors=k)
+        ranked = self.ranker.rank_batch(cities, content, collaborative, limit)
+        return [
+            {
+                'city': city,
+                'content': place_names,
+                'collaborative': neighbours,
+                'recommendations': names,
+                'scores': scores,
+            }
+            for city, (place_names, _), (neighbours, _), (names, scores) in zip(cities, content, collaborative, ranked)
+        ]
+
+    # Function to recommend cities for one user from their own ratings; unknown users
+    # (or users without ratings) get known=False and no recommendations
+    def recommend_user(self, user_id, k=N_RECOMMENDATIONS):
+        personal = self.personal
+        cities, scores = personal.recommend_with_scores(user_id, k)
+        return {
+            'user': user_id,
+            'known': user_id in personal,
+            'recommendations': cities,
+            'scores': scores,
+        }
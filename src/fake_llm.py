@@ -0,0 +1,150 @@
+"""Local fake of the Gemini REST API for development and load testing.
+
+It answers generateContent and streamGenerateContent with a canned markdown
+reply that echoes the request, so the Itinerary Planner can run without an API
+key or network access.
+
+Usage:
+    python -m src.fake_llm [--port 8765] [--delay 0.05] [--chunks 5]
+
+then start the app with GEMINI_API_ENDPOINT=http://127.0.0.1:8765.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FINISH_REASON_STOP = 1
+
+
+def _reply_text(request):
+    texts = [
+        part.get("text", "")
+        for content in request.get("contents", [])
+        for part in content.get("parts", [])
+    ]
+    # The last part is the user's form input; keep the reply short and deterministic
+    user_input = " ".join(texts[-1].split()) if texts else ""
+    return f"## Fake itinerary\n\nYou asked for: {user_input}\n\n- Day 1: Explore\n- Day 2: Relax\n"
+
+
+def _chunk(text, finished, prompt_tokens, output_tokens):
+    chunk = {
+        "candidates": [{
+            "content": {"parts": [{"text": text}], "role": "model"},
+            "index": 0,
+        }],
+        "usageMetadata": {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": output_tokens,
+            "totalTokenCount": prompt_tokens + output_tokens,
+        },
+    }
+    if finished:
+        chunk["candidates"][0]["finishReason"] = FINISH_REASON_STOP
+    return chunk
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        with self.server.lock:
+            self.server.requests.append({"path": self.path, "body": request})
+
+        if self.server.fail_next > 0:
+            with self.server.lock:
+                self.server.fail_next -= 1
+            self._send_json(self.server.fail_status, {"error": {"code": self.server.fail_status, "message": "fake failure"}})
+            return
+
+        text = _reply_text(request)
+        prompt_tokens = sum(len(p.get("text", "").split()) for c in request.get("contents", []) for p in c.get("parts", []))
+        output_tokens = len(text.split())
+
+        if ":streamGenerateContent" in self.path:
+            self._stream(text, prompt_tokens, output_tokens)
+        elif ":generateContent" in self.path:
+            time.sleep(self.server.delay * self.server.chunks)
+            self._send_json(200, _chunk(text, True, prompt_tokens, output_tokens))
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": f"Unknown path {self.path}"}})
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    # The REST transport reads a streamed JSON array: [chunk, chunk, ...]
+    def _stream(self, text, prompt_tokens, output_tokens):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        n = max(1, self.server.chunks)
+        size = -(-len(text) // n)
+        pieces = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+        for i, piece in enumerate(pieces):
+            time.sleep(self.server.delay)
+            finished = i == len(pieces) - 1
+            body = json.dumps(_chunk(piece, finished, prompt_tokens, output_tokens))
+            self._write_chunk(("[" if i == 0 else ",\n") + body + ("]" if finished else ""))
+        self._write_chunk("")
+
+    def _write_chunk(self, data):
+        data = data.encode()
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+class FakeGeminiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, delay=0.0, chunks=5, verbose=False):
+        super().__init__((host, port), FakeGeminiHandler)
+        self.delay = delay
+        self.chunks = chunks
+        self.verbose = verbose
+        self.requests = []
+        self.lock = threading.Lock()
+        self.fail_next = 0
+        self.fail_status = 503
+
+    @property
+    def endpoint(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    # Function to run the server on a background thread (for scripts and tests)
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Gemini REST server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.05, help="seconds per streamed chunk")
+    parser.add_argument("--chunks", type=int, default=5)
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(args.host, args.port, args.delay, args.chunks, verbose=True)
+    print(f"Fake Gemini API listening on {server.endpoint}")
+    server.serve_forever()
@@ -0,0 +1,102 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src import metrics
+
+# Default blend; HYBRID_CONTENT_WEIGHT overrides it (the collaborative weight is 1 - that)
+CONTENT_WEIGHT = 0.5
+
+
+# Function to scale every row of a (rows x candidates) matrix of similarities (>= 0) by
+# its best value, ignoring NaN padding. The best candidate scores 1 and the others keep
+# their ratio to it, so nearly equal candidates get nearly equal scores and the last one
+# is not pushed to 0. A row whose best value is 0 (including a zero range of 0) scales to
+# 1, so one candidate, or equal candidates, still count in full.
+def scale_rows(values):
+    with np.errstate(invalid='ignore'):
+        if values.shape[1] == 0:
+            return values
+        valid = ~np.isnan(values)
+        values = np.maximum(values, 0)
+        best = np.where(valid, values, 0).max(axis=1, keepdims=True)
+        scaled = np.where(best > 0, values / np.where(best > 0, best, 1), 1.0)
+    return np.where(valid, scaled, np.nan)
+
+
+# Function to turn kNN distances into similarities in (0, 1] (as src.personal does)
+def distance_similarity(distances):
+    return 1.0 / (1.0 + distances)
+
+
+# Function to pad a list of (names, values) pairs into (rows x width) name and value matrices
+def _pad(results, width):
+    names = np.full((len(results), width), None, dtype=object)
+    values = np.full((len(results), width), np.nan)
+    for i, (row_names, row_values) in enumerate(results):
+        names[i, :len(row_names)] = row_names
+        values[i, :len(row_values)] = row_values
+    return names, values
+
+
+class HybridRanker:
+    """Blends content similarity scores and collaborative kNN distances into one ranking.
+
+    Distances become similarities 1 / (1 + d). Both signals are then divided by their
+    best value per selected city, so the top candidate of each scores 1 and the others
+    keep their ratio to it. They are weighted and summed for cities suggested by both.
+    Ties keep the order in which the candidates were suggested, content first."""
+
+    def __init__(self, content_weight=None, collaborative_weight=None):
+        if content_weight is None:
+            content_weight = float(os.getenv('HYBRID_CONTENT_WEIGHT', CONTENT_WEIGHT))
+        if collaborative_weight is None:
+            collaborative_weight = 1.0 - content_weight
+        if content_weight < 0 or collaborative_weight < 0:
+            raise ValueError("Hybrid weights must not be negative")
+        self.content_weight = content_weight
+        self.collaborative_weight = collaborative_weight
+
+    # Function to rank many selected cities at once.
+    # content: [(cities, similarity scores)], collaborative: [(cities, kNN distances)], one per selected city.
+    # Returns [(cities, blended scores)], best first, without the selected city; k=None keeps every candidate.
+    @metrics.timed('recommend_seconds', recommender='hybrid')
+    def rank_batch(self, selected_cities, content, collaborative, k=None):
+        n_rows = len(selected_cities)
+        width = max([len(names) for names, _ in content] + [len(names) for names, _ in collaborative] + [0])
+        content_names, content_scores = _pad(content, width)
+        collab_names, collab_distances = _pad(collaborative, width)
+
+        # The nearest collaborative neighbour is the selected city itself; drop it before scaling
+        selected = np.asarray(selected_cities, dtype=object)[:, None]
+        content_scores[content_names == selected] = np.nan
+        collab_distances[collab_names == selected] = np.nan
+
+        names = np.concatenate([content_names, collab_names], axis=1)
+        blended = np.concatenate([
+            self.content_weight * scale_rows(content_scores),
+            self.collaborative_weight * scale_rows(distance_similarity(collab_distances)),
+        ], axis=1)
+
+        valid = ~np.isnan(blended)
+        row, position = np.nonzero(valid)
+        codes, _ = pd.factorize(names[valid])
+        # Sum the blended score of a city suggested by both recommenders
+        keys, first, inverse = np.unique(row * (codes.max(initial=0) + 1) + codes, return_index=True, return_inverse=True)
+        scores = np.bincount(inverse, weights=blended[valid])
+        rows_out = row[first]
+        positions = position[first]
+        labels = names[valid][first]
+
+        order = np.lexsort((positions, -np.round(scores, 9), rows_out))
+        rows_out, labels, scores = rows_out[order], labels[order], scores[order]
+        starts = np.searchsorted(rows_out, np.arange(n_rows + 1))
+        results = []
+        for i in range(n_rows):
+            stop = starts[i + 1] if k is None else min(starts[i + 1], starts[i] + k)
+            results.append((labels[starts[i]:stop].tolist(), scores[starts[i]:stop].tolist()))
+        return results
+
+    def rank(self, selected_city, content, collaborative, k=None):
+        return self.rank_batch([selected_city], [content], [collaborative], k)[0]
@@ -0,0 +1,468 @@
+"""Incremental updates of the recommendation artifacts for new places and ratings.
+
+New places are stemmed, vectorized with the saved tag vocabulary and appended to
+place_list, content_vectors, similarity and content_neighbours; only rows whose
+top-K can change are recomputed. Rating deltas are upserted into city_ratings and
+only the neighbour lists they can affect are recomputed. Every file is written next
+to its artifact first and swapped in with publish(), so running apps (which reload
+on file change) see either the old or the new set.
+
+Full rebuilds (build-artifacts) remain the reference; an update matches them up to
+the order of equally scored neighbours as long as the vocabulary stays within
+max_features. A rating delta replaces the stored rating of its (user, city) pair,
+both in the artifacts and, with --append-data, in Data/Rating.xlsx. --verify
+compares the rating artifacts with a full rebuild from Data/. Deltas for users or
+cities below the rebuild's rating-count thresholds show up there as differences.
+
+Usage:
+    update-artifacts [--places new_places.xlsx] [--ratings new_ratings.xlsx] [--append-data] [--verify]
+"""
+import argparse
+import json
+import logging
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+from src.artifacts import ArtifactRegistry, publish
+from src.collaborative import LIVE_OVERFETCH, CityNeighbours, SparseKNN, SparseRatings, build_neighbour_table, stable_order
+from src.content import VOCABULARY_PATH, NeighbourTable, fit_vectorizer, top_k
+from src.datastore import DataStore
+from src.tags import STEM_CACHE_PATH, build_tags, stem_tags
+
+logger = logging.getLogger(__name__)
+
+# Same limit as vectorize_tags; new terms beyond it are ignored until a full rebuild
+MAX_FEATURES = 5000
+
+# Scores/distances are compared after rounding, like top_k and stable_order do
+TOLERANCE = 1e-6
+
+# A rating row is identified by this pair in Rating.xlsx
+RATING_KEY = ["User ID", "City ID"]
+
+
+###########################################################################################
+# Content index
+
+# Function to get the tag vocabulary in content_vectors column order. Artifacts built
+# before the vocabulary was saved get it refitted from place_list (same tags, same terms).
+def load_vocabulary(path, travel, n_columns):
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            vocabulary = json.load(f)
+    else:
+        vocabulary = fit_vectorizer(travel["tags"], MAX_FEATURES)[0]
+    if len(vocabulary) != n_columns:
+        raise ValueError(
+            f"Tag vocabulary has {len(vocabulary)} terms but content_vectors has {n_columns} columns; "
+            "rebuild the artifacts with build-artifacts"
+        )
+    return vocabulary
+
+
+# Function to count the vocabulary terms of each tag string; unseen terms are appended
+# to the vocabulary while it holds fewer than max_features terms.
+# Returns (counts, vocabulary, number of dropped terms).
+def encode_tags(tags, vocabulary, max_features=MAX_FEATURES):
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    analyzer = CountVectorizer(stop_words="english").build_analyzer()
+    vocabulary = list(vocabulary)
+    columns = {term: i for i, term in enumerate(vocabulary)}
+    rows, cols, dropped = [], [], set()
+    for row, text in enumerate(tags):
+        for term in analyzer(text):
+            col = columns.get(term)
+            if col is None:
+                if len(vocabulary) >= max_features:
+                    dropped.add(term)
+                    continue
+                col = columns[term] = len(vocabulary)
+                vocabulary.append(term)
+            rows.append(row)
+            cols.append(col)
+    counts = sparse.csr_matrix(
+        (np.ones(len(rows)), (rows, cols)), shape=(len(tags), len(vocabulary)), dtype=np.float64
+    )
+    counts.sum_duplicates()
+    return counts, vocabulary, len(dropped)
+
+
+def _widen(matrix, n_columns):
+    matrix = sparse.csr_matrix(matrix)
+    return sparse.csr_matrix((matrix.data, matrix.indices, matrix.indptr), shape=(matrix.shape[0], n_columns))
+
+
+# Function to add new places (stemmed place_list rows) to the content index.
+# vectors are the L2-normalized content vectors; similarity and table may be None.
+# Returns a dict with the updated travel, vectors, vocabulary, similarity and table.
+def add_places(travel, vectors, vocabulary, new_rows, similarity=None, table=None):
+    n_old = vectors.shape[0]
+    counts, vocabulary, dropped = encode_tags(new_rows["tags"].tolist(), vocabulary)
+    if dropped:
+        logger.warning("%d new tag terms exceed max_features=%d and were ignored; run a full rebuild", dropped, MAX_FEATURES)
+
+    new_vectors = normalize(counts, norm="l2", axis=1)
+    vectors = sparse.vstack([_widen(vectors, len(vocabulary)), new_vectors], format="csr")
+    travel = pd.concat([travel, new_rows[travel.columns]], ignore_index=True)
+    n = vectors.shape[0]
+    new_ids = np.arange(n_old, n)
+
+    # Cosine of every place with every new place (n x n_new); nothing else changes
+    block = (vectors @ new_vectors.T).toarray()
+
+    if similarity is not None:
+        grown = np.empty((n, n), dtype=np.asarray(similarity).dtype)
+        grown[:n_old, :n_old] = similarity
+        grown[:, n_old:] = block
+        grown[n_old:, :] = block.T
+        similarity = grown
+
+    if table is not None:
+        table = _update_content_table(table, vectors, block, new_ids)
+
+    return {"travel": travel, "vectors": vectors, "vocabulary": vocabulary, "similarity": similarity, "table": table}
+
+
+def _update_content_table(table, vectors, block, new_ids):
+    n_old = len(table)
+    k = table.indices.shape[1]
+    new_idx, new_scores = top_k(block.T, k, exclude=new_ids)
+
+    # An old row changes only if a new place scores at least its current k-th neighbour
+    kth = table.scores[:, k - 1].astype(np.float64) if k else np.full(n_old, np.inf)
+    affected = np.flatnonzero(np.round(block[:n_old], 9).max(axis=1, initial=-np.inf) >= kth - TOLERANCE)
+    indices = np.vstack([table.indices, new_idx.astype(table.indices.dtype)])
+    scores = np.vstack([table.scores, new_scores.astype(table.scores.dtype)])
+
+    if len(affected):
+        # Candidates are the old neighbours plus every new place, rescored exactly and in
+        # column order so top_k breaks ties by row position like a full rebuild
+        old = table.indices[affected].astype(np.intp)
+        old_scores = np.asarray(
+            vectors[np.repeat(affected, k)].multiply(vectors[old.ravel()]).sum(axis=1)
+        ).reshape(len(affected), k)
+        candidates = np.hstack([old, np.broadcast_to(new_ids, (len(affected), len(new_ids)))])
+        candidate_scores = np.hstack([old_scores, block[affected]])
+        order = np.argsort(candidates, axis=1, kind="stable")
+        candidates = np.take_along_axis(candidates, order, axis=1)
+        picked, picked_scores = top_k(np.take_along_axis(candidate_scores, order, axis=1), k)
+        indices[affected] = np.take_along_axis(candidates, picked, axis=1)
+        scores[affected] = picked_scores
+    logger.info("Content neighbours: %d new rows, %d existing rows updated", len(new_ids), len(affected))
+    return NeighbourTable(indices, scores)
+
+
+###########################################################################################
+# Collaborative index
+
+# Function to upsert (City, User ID, Travel Rating) rows into the sparse ratings.
+# New cities and users are appended; a delta replaces the stored rating of its pair.
+# Returns (ratings, changed city rows).
+def upsert_ratings(ratings, deltas, city="City", user="User ID", rating="Travel Rating"):
+    triplets = deltas.groupby([city, user], sort=False, observed=True)[rating].mean().reset_index()
+    cities = triplets[city].astype(str)
+    users = triplets[user].astype(str)
+    index = ratings.index.astype(str)
+    columns = ratings.columns.astype(str)
+    index = index.append(pd.Index(cities[~cities.isin(index)].unique()))
+    columns = columns.append(pd.Index(users[~users.isin(columns)].unique()))
+
+    rows = index.get_indexer(cities).astype(np.int64)
+    cols = columns.get_indexer(users).astype(np.int64)
+    old = ratings.matrix.tocoo()
+    n_users = len(columns)
+    keep = ~np.isin(old.row.astype(np.int64) * n_users + old.col, rows * n_users + cols)
+    matrix = sparse.coo_matrix(
+        (
+            np.concatenate([old.data[keep], triplets[rating].to_numpy(dtype=np.float64)]),
+            (np.concatenate([old.row[keep], rows]), np.concatenate([old.col[keep], cols])),
+        ),
+        shape=(len(index), n_users),
+    ).tocsr()
+    matrix.eliminate_zeros()
+    return SparseRatings(matrix, index, columns), np.unique(rows)
+
+
+# Function to update the city neighbour table after the rows in changed were rewritten
+def update_city_table(table, ratings, changed):
+    knn = SparseKNN(ratings.matrix)
+    n_old, k = len(table.cities), table.k
+    n = len(ratings)
+    changed = np.asarray(changed, dtype=np.intp)
+
+    # Distance of every city to each changed city (n x len(changed))
+    dot = (ratings.matrix @ ratings.matrix[changed].T).toarray()
+    distances_to_changed = np.sqrt(np.maximum(knn.sq_norms[:, None] + knn.sq_norms[changed][None, :] - 2 * dot, 0))
+
+    old_rows = np.setdiff1d(np.arange(n_old), changed)
+    listed = np.isin(table.indices[old_rows], changed).any(axis=1)
+    # Lists holding a changed city must be recomputed: its distance may have grown
+    recompute = np.union1d(changed, old_rows[listed])
+    candidates = old_rows[~listed]
+    kth = table.distances[candidates, k - 1]
+    closer = np.round(distances_to_changed[candidates], 9).min(axis=1, initial=np.inf) <= np.round(kth, 9) + TOLERANCE
+    merge = candidates[closer]
+
+    indices = np.vstack([table.indices, np.zeros((n - n_old, k), dtype=table.indices.dtype)])
+    distances = np.vstack([table.distances, np.zeros((n - n_old, k), dtype=table.distances.dtype)])
+    if len(recompute):
+        d, i = stable_order(*knn.kneighbors(ratings.matrix[recompute], n_neighbors=min(n, k + LIVE_OVERFETCH)))
+        indices[recompute] = i[:, :k]
+        distances[recompute] = d[:, :k]
+    if len(merge):
+        d, i = stable_order(
+            np.hstack([table.distances[merge], distances_to_changed[merge]]),
+            np.hstack([table.indices[merge].astype(np.intp), np.broadcast_to(changed, (len(merge), len(changed)))]),
+        )
+        indices[merge] = i[:, :k]
+        distances[merge] = d[:, :k]
+    logger.info("City neighbours: %d rows recomputed, %d rows merged", len(recompute), len(merge))
+    return CityNeighbours(ratings.index.to_numpy().astype(str), indices, distances)
+
+
+###########################################################################################
+# Staging and publishing
+
+class Update:
+    """Collects the files of one update as <path>.tmp until they are published together."""
+
+    def __init__(self, root="."):
+        self.root = root
+        self.staged = {}
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def _stage(self, path, write):
+        staged_path = f"{path}.tmp"
+        with open(staged_path, "wb") as f:
+            write(f)
+        self.staged[path] = staged_path
+
+    def pickle(self, path, obj):
+        self._stage(path, lambda f: pickle.dump(obj, f))
+
+    def npz(self, path, arrays):
+        self._stage(path, lambda f: np.savez(f, **arrays))
+
+    def sparse(self, path, matrix):
+        self._stage(path, lambda f: sparse.save_npz(f, matrix))
+
+    def json(self, path, obj):
+        self._stage(path, lambda f: f.write(json.dumps(obj).encode("utf-8")))
+
+    def discard(self):
+        for staged_path in self.staged.values():
+            if os.path.exists(staged_path):
+                os.remove(staged_path)
+        self.staged.clear()
+
+    # Function to swap every staged file in; artifacts/mmap is re-exported if it exists
+    def publish(self):
+        mmap_dir = self.path("artifacts/mmap")
+
+        def export():
+            if os.path.exists(os.path.join(mmap_dir, "manifest.json")):
+                from src.mmap_artifacts import export_mmap
+
+                export_mmap(ArtifactRegistry(root=self.root), mmap_dir)
+
+        publish(self.staged, self.root, after_swap=export)
+        self.staged = {}
+
+
+# Function to read a delta file (.xlsx, .csv or .pkl) into a DataFrame
+def read_delta(path):
+    if path.endswith(".csv"):
+        return pd.read_csv(path)
+    if path.endswith(".pkl"):
+        return pd.read_pickle(path)
+    return pd.read_excel(path)
+
+
+def _exists(registry, name):
+    return name in registry and os.path.exists(registry.path(name))
+
+
+def _stage_places(update, registry, places, stem_cache):
+    new_rows = build_tags(places)
+    new_rows["tags"], _ = stem_tags(new_rows["tags"].tolist(), stem_cache)
+    travel = registry["place_list"]
+    vectors = registry["content_vectors"]
+    vocabulary = load_vocabulary(update.path(VOCABULARY_PATH), travel, vectors.shape[1])
+    similarity = registry["similarity"] if _exists(registry, "similarity") else None
+    table = NeighbourTable.from_arrays(registry["content_neighbours"]) if _exists(registry, "content_neighbours") else None
+
+    result = add_places(travel, vectors, vocabulary, new_rows, similarity, table)
+    update.pickle(registry.path("place_list"), result["travel"])
+    update.sparse(registry.path("content_vectors"), result["vectors"])
+    update.json(update.path(VOCABULARY_PATH), result["vocabulary"])
+    if result["similarity"] is not None:
+        update.pickle(registry.path("similarity"), result["similarity"])
+    if result["table"] is not None:
+        update.npz(registry.path("content_neighbours"), {"indices": result["table"].indices, "scores": result["table"].scores})
+    return len(new_rows)
+
+
+# Function to fill in City from City ID (or the reverse) using Data/City.xlsx
+def with_city(root, ratings):
+    if "City" in ratings.columns and "City ID" in ratings.columns:
+        return ratings
+    city = DataStore(root).read("city", ["City ID", "City"])
+    key = "City ID" if "City ID" in ratings.columns else "City"
+    merged = ratings.merge(city, on=key, how="left")
+    missing = merged["City"].isna() | merged["City ID"].isna()
+    if missing.any():
+        logger.warning("Skipping %d ratings for cities missing from City.xlsx", int(missing.sum()))
+    merged = merged[~missing]
+    if "City Name" not in merged.columns:
+        merged["City Name"] = merged["City"]
+    return merged
+
+
+def _load_ratings(registry):
+    if _exists(registry, "city_ratings"):
+        return SparseRatings.from_arrays(registry["city_ratings"])
+    city_pivot = registry["city_pivot"]
+    return SparseRatings(sparse.csr_matrix(city_pivot.to_numpy()), city_pivot.index, city_pivot.columns.astype(str))
+
+
+def _stage_ratings(update, registry, deltas, k):
+    ratings, changed = upsert_ratings(_load_ratings(registry), deltas)
+    if _exists(registry, "city_neighbours"):
+        table = update_city_table(CityNeighbours.from_arrays(registry["city_neighbours"]), ratings, changed)
+    else:
+        table = build_neighbour_table(SparseKNN(ratings.matrix), ratings, k)
+
+    update.npz(registry.path("city_ratings"), ratings.to_arrays())
+    update.npz(registry.path("city_neighbours"), table.to_arrays())
+    update.pickle(registry.path("city_name"), ratings.index)
+    if _exists(registry, "city_pivot"):
+        from src.pipeline import fit_model
+
+        city_pivot = ratings.to_frame()
+        update.pickle(registry.path("city_pivot"), city_pivot)
+        update.pickle(registry.path("model"), fit_model(city_pivot))
+    return len(changed)
+
+
+def _rating_keys(df):
+    return pd.MultiIndex.from_frame(df[RATING_KEY].astype(str))
+
+
+# Function to append the deltas to the source spreadsheets so full rebuilds include them.
+# Like upsert_ratings, a rating replaces the rows already stored for its (user, city) pair.
+def append_data(root, places=None, ratings=None):
+    store = DataStore(root)
+    for table, rows in (("content", places), ("rating", ratings)):
+        if rows is None:
+            continue
+        path = store.source(table)
+        existing = pd.read_excel(path)
+        if table == "rating":
+            existing = existing[~_rating_keys(existing).isin(_rating_keys(rows))]
+        staged_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}")
+        pd.concat([existing, rows[[c for c in existing.columns if c in rows.columns]]], ignore_index=True).to_excel(
+            staged_path, index=False, engine="openpyxl"
+        )
+        os.replace(staged_path, path)
+        if os.path.exists(store.path(table)):
+            store.ingest(table)
+
+
+# Function to apply new places and/or rating deltas to the artifacts under root.
+# Returns {'places': places added, 'cities': city rows whose ratings changed}.
+def update_artifacts(root=".", places=None, ratings=None, k=20, keep_data=False):
+    registry = ArtifactRegistry(root=root)
+    update = Update(root)
+    summary = {"places": 0, "cities": 0}
+    try:
+        if places is not None and len(places):
+            summary["places"] = _stage_places(update, registry, places, os.path.join(root, STEM_CACHE_PATH))
+        if ratings is not None and len(ratings):
+            ratings = with_city(root, ratings)
+            summary["cities"] = _stage_ratings(update, registry, ratings, k)
+    except BaseException:
+        update.discard()
+        raise
+    if update.staged:
+        update.publish()
+    if keep_data:
+        append_data(root, places, ratings)
+    return summary
+
+
+# Function to compare the rating artifacts under root with a full rebuild from Data/
+# (the final_rating and collaborative stages of build-artifacts). Neighbour lists are
+# compared by distance, as equally distant cities may be listed in another order.
+# Returns a list of differences; empty when the artifacts match.
+def verify_ratings(root="."):
+    from src.pipeline import CITY_COLUMNS, build_final_rating, read_active_ratings
+
+    store = DataStore(root)
+    expected = SparseRatings.from_triplets(build_final_rating(read_active_ratings(store), store.read("city", CITY_COLUMNS)))
+    registry = ArtifactRegistry(root=root)
+    actual = _load_ratings(registry)
+
+    problems = []
+    for label, have, want in (("cities", actual.index.astype(str), expected.index.astype(str)),
+                              ("users", actual.columns.astype(str), expected.columns.astype(str))):
+        for extra, where in ((have.difference(want), "not in"), (want.difference(have), "missing from the artifacts but in")):
+            if len(extra):
+                problems.append(f"{len(extra)} {label} {where} a full rebuild: {', '.join(extra[:5])}")
+
+    cities = actual.index.astype(str).intersection(expected.index.astype(str))
+    users = actual.columns.astype(str).intersection(expected.columns.astype(str))
+    have = actual.matrix[actual.index.astype(str).get_indexer(cities)][:, actual.columns.astype(str).get_indexer(users)].toarray()
+    want = expected.matrix[expected.index.astype(str).get_indexer(cities)][:, expected.columns.astype(str).get_indexer(users)].toarray()
+    rows, cols = np.nonzero(np.abs(have - want) > TOLERANCE)
+    if len(rows):
+        problems.append(f"{len(rows)} ratings differ, e.g. " + ", ".join(
+            f"{cities[r]}/{users[c]}: {have[r, c]:g} vs {want[r, c]:g}" for r, c in zip(rows[:5], cols[:5])
+        ))
+
+    if not problems and _exists(registry, "city_neighbours"):
+        table = CityNeighbours.from_arrays(registry["city_neighbours"])
+        rebuilt = build_neighbour_table(SparseKNN(expected.matrix), expected, table.k)
+        order = pd.Index(table.cities).get_indexer(rebuilt.cities)
+        differ = (np.abs(np.round(table.distances[order], 9) - np.round(rebuilt.distances, 9)) > TOLERANCE).any(axis=1)
+        if differ.any():
+            problems.append(f"{int(differ.sum())} neighbour lists differ, e.g. {', '.join(rebuilt.cities[differ][:5])}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply new places and ratings to artifacts/ without a full rebuild")
+    parser.add_argument("--root", default=".", help="project directory containing Data/ and artifacts/")
+    parser.add_argument("--places", help="new rows in the Content.xlsx layout (.xlsx, .csv or .pkl)")
+    parser.add_argument("--ratings", help="new rows in the Rating.xlsx layout, or with a City column instead of City ID")
+    parser.add_argument("-k", type=int, default=20, help="neighbours kept per city when no neighbour table exists yet")
+    parser.add_argument("--append-data", action="store_true", help="also append the rows to Data/Content.xlsx and Data/Rating.xlsx")
+    parser.add_argument("--verify", action="store_true", help="compare the rating artifacts with a full rebuild from Data/")
+    args = parser.parse_args(argv)
+    if not args.places and not args.ratings and not args.verify:
+        parser.error("nothing to do: pass --places and/or --ratings (or --verify)")
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    places = read_delta(args.places) if args.places else None
+    ratings = read_delta(args.ratings) if args.ratings else None
+    if places is not None or ratings is not None:
+        summary = update_artifacts(args.root, places, ratings, args.k, args.append_data)
+        print(f"Added {summary['places']} places, updated ratings of {summary['cities']} cities")
+    if args.verify:
+        problems = verify_ratings(args.root)
+        for problem in problems:
+            print(f"Differs from a full rebuild: {problem}")
+        if problems:
+            raise SystemExit(1)
+        print("Rating artifacts match a full rebuild")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import asyncio
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from src import metrics
+from src.llm_cache import cache_key, get_cache
+from src.llm_gateway import get_gateway
+
+MODEL_NAME = "gemini-1.5-flash-001"
+
+_model = None
+_model_lock = threading.Lock()
+
+
+# Function to configure the Gemini client once per process.
+# GEMINI_API_ENDPOINT points the client at another server (e.g. python -m src.fake_llm).
+def configure():
+    import google.generativeai as genai
+
+    load_dotenv()
+    endpoint = os.getenv("GEMINI_API_ENDPOINT")
+    if endpoint:
+        genai.configure(
+            api_key=os.getenv("GOOGLE_API_KEY") or "fake",
+            transport="rest",
+            client_options={"api_endpoint": endpoint},
+        )
+    else:
+        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+    return genai
+
+
+def model_name():
+    return os.getenv("GEMINI_MODEL", MODEL_NAME)
+
+
+# Function to get the single GenerativeModel shared by every session
+def get_model():
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                genai = configure()
+                _model = genai.GenerativeModel(model_name())
+    return _model
+
+
+def reset_model():
+    global _model
+    with _model_lock:
+        _model = None
+
+
+# Function to record the token counts Gemini reports for a response (or its last chunk)
+def record_usage(response):
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    metrics.count("llm_tokens_total", usage.prompt_token_count or 0, model=model_name(), kind="prompt")
+    metrics.count("llm_tokens_total", usage.candidates_token_count or 0, model=model_name(), kind="output")
+
+
+# Function to look a response up in the cache and count the hit or miss
+def _cached(cache, prompt, input):
+    if cache is None:
+        return None
+    cached = cache.get(model_name(), prompt, input)
+    metrics.count("cache_requests_total", cache="llm", result="hit" if cached is not None else "miss")
+    return cached
+
+
+# Function to get the client options for one attempt. The client's own retries are
+# disabled: the gateway retries with backoff and counts each attempt against its limits.
+def request_options(timeout):
+    return {"timeout": timeout, "retry": None}
+
+
+# Function to load Google Gemini Pro Model and get response (served from the cache when
+# possible; identical requests in flight share one call through the gateway)
+def get_response(prompt, input):
+    cache = get_cache()
+    cached = _cached(cache, prompt, input)
+    if cached is not None:
+        return cached
+
+    def call(timeout):
+        try:
+            with metrics.timed("llm_request_seconds", model=model_name(), mode="blocking"):
+                response = get_model().generate_content([prompt, input], stream=False, request_options=request_options(timeout))
+                text = response.text
+        except Exception as e:
+            metrics.count("llm_errors_total", model=model_name(), error=type(e).__name__)
+            raise
+        record_usage(response)
+        if cache is not None:
+            cache.put(model_name(), prompt, input, text)
+        return text
+
+    return get_gateway(model_name()).call(cache_key(model_name(), prompt, input), call)
+
+
+# Function to yield the response text chunk by chunk as Gemini generates it.
+# A cached response is yielded in one piece, as is one shared with an identical
+# request already in flight; a fresh one is cached once complete.
+def stream_response(prompt, input):
+    cache = get_cache()
+    cached = _cached(cache, prompt, input)
+    if cached is not None:
+        yield cached
+        return
+
+    def open_stream(timeout):
+        chunks = []
+        chunk = None
+        start_time = time.perf_counter()
+        try:
+            response = get_model().generate_content([prompt, input], stream=True, request_options=request_options(timeout))
+            for chunk in response:
+                text = chunk.text
+                if text:
+                    if not chunks:
+                        metrics.observe("llm_first_chunk_seconds", time.perf_counter() - start_time, model=model_name())
+                    chunks.append(text)
+                    yield text
+        except Exception as e:
+            metrics.count("llm_errors_total", model=model_name(), error=type(e).__name__)
+            raise
+        metrics.observe("llm_request_seconds", time.perf_counter() - start_time, model=model_name(), mode="stream")
+        # Usage metadata arrives with the final chunk
+        record_usage(chunk)
+        if cache is not None:
+            cache.put(model_name(), prompt, input, "".join(chunks))
+
+    yield from get_gateway(model_name()).stream(cache_key(model_name(), prompt, input), open_stream)
+
+
+# Async path: the blocking client call runs in a worker thread so several prompts
+# can be in flight at once from one event loop
+async def get_response_async(prompt, input):
+    return await asyncio.to_thread(get_response, prompt, input)
+
+
+# Function to send several named (prompt, input) pairs concurrently.
+# Returns {name: text}; a failed section maps to its exception instead of text.
+async def gather_responses(requests):
+    names = list(requests)
+    results = await asyncio.gather(
+        *(get_response_async(*requests[name]) for name in names),
+        return_exceptions=True,
+    )
+    return dict(zip(names, results))
+
+
+def gather_responses_sync(requests):
+    return asyncio.run(gather_responses(requests))
@@ -0,0 +1,196 @@
+"""Persistent SQLite cache for Itinerary Planner responses.
+
+Entries are keyed on the normalized (model, prompt template, form input) tuple,
+expire after a TTL and are evicted least-recently-used once the cache is full.
+
+Usage (opt-in prewarm for the first N cities of place_list):
+    python -m src.llm_cache prewarm --top 20
+    python -m src.llm_cache stats
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_PATH = ".cache/llm_responses.sqlite"
+DEFAULT_TTL = 7 * 24 * 3600  # seconds
+DEFAULT_MAX_ENTRIES = 5000
+
+
+# Function to normalize text so trivially different requests share an entry
+def normalize(text):
+    return " ".join(str(text).split()).casefold()
+
+
+def cache_key(model_name, prompt, input):
+    payload = json.dumps([model_name, normalize(prompt), normalize(input)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path=CACHE_PATH, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+
+    def get(self, model_name, prompt, input):
+        key = cache_key(model_name, prompt, input)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def __contains__(self, request):
+        model_name, prompt, input = request
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created FROM responses WHERE key = ?", (cache_key(model_name, prompt, input),)
+            ).fetchone()
+        return row is not None and time.time() - row[0] <= self.ttl
+
+    def put(self, model_name, prompt, input, response):
+        key = cache_key(model_name, prompt, input)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, model_name, response, now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY accessed ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "ttl": self.ttl,
+            "max_entries": self.max_entries,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+# Function to get the process-wide cache, or None when LLM_CACHE=0.
+# LLM_CACHE_PATH, LLM_CACHE_TTL (seconds) and LLM_CACHE_MAX_ENTRIES override the defaults.
+def get_cache():
+    global _cache
+    if os.getenv("LLM_CACHE", "1") == "0":
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(
+                    os.getenv("LLM_CACHE_PATH", CACHE_PATH),
+                    float(os.getenv("LLM_CACHE_TTL", DEFAULT_TTL)),
+                    int(os.getenv("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                )
+    return _cache
+
+
+# Function to fill the cache with the default-option requests for the top-N cities
+def prewarm(cities, model_name, cache=None):
+    from src.llm import gather_responses
+    from src.prompts import default_requests
+    import asyncio
+
+    cache = cache or get_cache()
+    warmed, skipped, failed = 0, 0, 0
+    for city in cities:
+        requests = {
+            section: request
+            for section, request in default_requests(city).items()
+            if (model_name, *request) not in cache
+        }
+        skipped += 4 - len(requests)
+        if not requests:
+            continue
+        # gather_responses stores successful responses in the cache itself
+        results = asyncio.run(gather_responses(requests))
+        for section, result in results.items():
+            if isinstance(result, Exception):
+                failed += 1
+                print(f"{city} / {section}: {result}")
+            else:
+                warmed += 1
+    return {"warmed": warmed, "skipped": skipped, "failed": failed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Itinerary Planner response cache")
+    sub = parser.add_subparsers(dest="command", required=True)
+    warm = sub.add_parser("prewarm", help="cache default-option responses for the first N cities of place_list")
+    warm.add_argument("--top", type=int, default=20)
+    sub.add_parser("stats", help="show cache size")
+    sub.add_parser("clear", help="drop every cached response")
+    args = parser.parse_args()
+
+    cache = get_cache()
+    if cache is None:
+        parser.error("the cache is disabled (LLM_CACHE=0)")
+
+    if args.command == "prewarm":
+        from src.artifacts import get_registry
+        from src.llm import model_name
+
+        travel = get_registry()["place_list"]
+        cities = list(dict.fromkeys(travel["city"].tolist()))[: args.top]
+        start_time = time.time()
+        result = prewarm(cities, model_name(), cache)
+        print(f"{result} in {time.time() - start_time:.1f} seconds")
+    elif args.command == "clear":
+        cache.clear()
+    print(cache.stats())
@@ -0,0 +1,295 @@
+"""Gateway for every upstream Gemini call: coalescing, rate limiting and retries.
+
+- Identical requests (same cache key as src.llm_cache) that arrive while one is in
+  flight share that single upstream call. Streamed requests share it too: the
+  followers get the complete text in one piece, like a cache hit.
+- A token bucket allows LLM_RATE calls per second on average, in bursts of up to
+  LLM_BURST calls, and at most LLM_MAX_CONCURRENCY calls are in flight at once.
+- Each call gets a LLM_TIMEOUT second timeout. Rate limits (429), server errors
+  (5xx), timeouts and connection errors are retried up to LLM_RETRIES times with
+  full-jitter exponential backoff. A stream is only retried before its first chunk.
+
+Usage (load test against a local fake Gemini server, no API key needed):
+    python -m src.llm_gateway [--requests 40] [--distinct 4] [--fail 2] [--fail-status 429] [--stream]
+"""
+import argparse
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from src import metrics
+
+DEFAULT_RATE = 1.0  # calls per second; 0 disables the limit
+DEFAULT_BURST = 8
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_TIMEOUT = 60.0  # seconds per attempt
+DEFAULT_RETRIES = 3
+BACKOFF_BASE = 1.0  # seconds; attempt n sleeps up to BACKOFF_BASE * 2**n
+BACKOFF_CAP = 20.0
+
+# HTTP statuses worth another attempt: timeouts, rate limits and server errors
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+# Function to decide whether a failed call may succeed when sent again.
+# google.api_core errors carry the HTTP status in .code; socket and requests errors
+# (timeouts, refused or reset connections) are all OSErrors.
+def retryable(error):
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code in RETRY_STATUSES
+    return isinstance(error, (TimeoutError, OSError))
+
+
+# Function to get the full-jitter backoff before retry number attempt (0-based)
+def backoff(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP, rng=random):
+    return rng.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class TokenBucket:
+    """Allows rate acquisitions per second on average and up to burst at once.
+
+    Callers reserve a token under the lock and then sleep until it is due, so waiting
+    threads are served in arrival order without polling."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    # Function to take one token, sleeping until it is available; returns the wait
+    def acquire(self):
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class LeaderAbandoned(Exception):
+    """The stream another request was waiting on was closed before it finished."""
+
+
+class Gateway:
+    """Coalesces, rate-limits, bounds and retries upstream calls."""
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, model="gemini"):
+        self.bucket = TokenBucket(rate, burst)
+        self.slots = threading.BoundedSemaphore(max(1, max_concurrency))
+        self.timeout = timeout
+        self.retries = retries
+        self.model = model
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    # Seconds a coalesced request waits for its leader before calling upstream itself
+    @property
+    def wait_limit(self):
+        return (self.timeout + BACKOFF_CAP) * (self.retries + 1)
+
+    # Function to register as the leader for key, or get the leader's future
+    def _join(self, key):
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future, False
+            future = self._inflight[key] = Future()
+            return future, True
+
+    def _finish(self, key, future, result=None, error=None):
+        with self._lock:
+            self._inflight.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    # Function to wait for the leader's result; None means "make the call yourself"
+    def _follow(self, future):
+        metrics.count("llm_coalesced_total", model=self.model)
+        try:
+            return future.result(timeout=self.wait_limit)
+        except (LeaderAbandoned, FutureTimeout):
+            return None
+
+    # Function to hold a concurrency slot and a rate token for one attempt
+    def _slot(self):
+        start_time = time.perf_counter()
+        self.slots.acquire()
+        try:
+            self.bucket.acquire()
+        except BaseException:
+            self.slots.release()
+            raise
+        metrics.observe("llm_throttle_seconds", time.perf_counter() - start_time, model=self.model)
+
+    def _retry_or_raise(self, error, attempt):
+        if attempt >= self.retries or not retryable(error):
+            raise error
+        metrics.count("llm_retries_total", model=self.model, error=type(error).__name__)
+        time.sleep(backoff(attempt))
+
+    # Function to run call(timeout) with slots, rate limit and retries
+    def _call(self, call):
+        attempt = 0
+        while True:
+            self._slot()
+            try:
+                return call(self.timeout)
+            except Exception as e:
+                error = e
+            finally:
+                self.slots.release()
+            self._retry_or_raise(error, attempt)
+            attempt += 1
+
+    # Function to get call(timeout)'s result, sharing it with identical requests in flight.
+    # call should also store the result (e.g. in the response cache) before returning.
+    def call(self, key, call):
+        future, leader = self._join(key)
+        if not leader:
+            result = self._follow(future)
+            if result is not None:
+                return result
+            return self._call(call)
+        try:
+            result = self._call(call)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    # Function to yield the text pieces of open_stream(timeout), holding a slot until the
+    # stream ends. Failures before the first piece are retried like call().
+    def _stream(self, open_stream):
+        attempt = 0
+        while True:
+            self._slot()
+            started = False
+            try:
+                for piece in open_stream(self.timeout):
+                    started = True
+                    yield piece
+                return
+            except Exception as e:
+                if started:
+                    raise
+                error = e
+            finally:
+                self.slots.release()
+            self._retry_or_raise(error, attempt)
+            attempt += 1
+
+    # Function to stream open_stream(timeout), or, when an identical request is already
+    # in flight, yield its complete text once it is done
+    def stream(self, key, open_stream):
+        future, leader = self._join(key)
+        if not leader:
+            result = self._follow(future)
+            if result is not None:
+                yield result
+                return
+            yield from self._stream(open_stream)
+            return
+        pieces = []
+        try:
+            for piece in self._stream(open_stream):
+                pieces.append(piece)
+                yield piece
+        except GeneratorExit:
+            self._finish(key, future, error=LeaderAbandoned())
+            raise
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, "".join(pieces))
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+# Function to get the process-wide gateway.
+# LLM_RATE, LLM_BURST, LLM_MAX_CONCURRENCY, LLM_TIMEOUT and LLM_RETRIES override the defaults.
+def get_gateway(model="gemini"):
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = Gateway(
+                    float(os.getenv("LLM_RATE", DEFAULT_RATE)),
+                    int(os.getenv("LLM_BURST", DEFAULT_BURST)),
+                    int(os.getenv("LLM_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)),
+                    float(os.getenv("LLM_TIMEOUT", DEFAULT_TIMEOUT)),
+                    int(os.getenv("LLM_RETRIES", DEFAULT_RETRIES)),
+                    model,
+                )
+    return _gateway
+
+
+def reset_gateway():
+    global _gateway
+    with _gateway_lock:
+        _gateway = None
+
+
+def main(argv=None):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from src import llm
+    from src.fake_llm import FakeGeminiServer
+
+    parser = argparse.ArgumentParser(description="Send concurrent requests through the gateway to a fake Gemini server")
+    parser.add_argument("--requests", type=int, default=40, help="requests sent at once")
+    parser.add_argument("--distinct", type=int, default=4, help="distinct prompts among them")
+    parser.add_argument("--fail", type=int, default=0, help="upstream calls the server fails first")
+    parser.add_argument("--fail-status", type=int, default=429)
+    parser.add_argument("--delay", type=float, default=0.05, help="seconds per streamed chunk")
+    parser.add_argument("--stream", action="store_true", help="use stream_response instead of get_response")
+    args = parser.parse_args(argv)
+
+    server = FakeGeminiServer(delay=args.delay).start()
+    server.fail_next, server.fail_status = args.fail, args.fail_status
+    os.environ["GEMINI_API_ENDPOINT"] = server.endpoint
+    os.environ["LLM_CACHE"] = "0"
+    llm.reset_model()
+    reset_gateway()
+    metrics.registry.reset()
+
+    def send(i):
+        prompt, input = "Plan a trip.", f"Destination: city {i % args.distinct}"
+        if args.stream:
+            return "".join(llm.stream_response(prompt, input))
+        return llm.get_response(prompt, input)
+
+    start_time = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.requests) as pool:
+            results = list(pool.map(send, range(args.requests)))
+    finally:
+        server.stop()
+    counters = {}
+    for counter in metrics.registry.snapshot()["counters"]:
+        counters[counter["name"]] = counters.get(counter["name"], 0) + counter["value"]
+    print(
+        f"{len(results)} requests ({args.distinct} distinct) in {time.perf_counter() - start_time:.2f}s: "
+        f"{len(server.requests)} upstream calls, {counters.get('llm_coalesced_total', 0)} coalesced, "
+        f"{counters.get('llm_retries_total', 0)} retries"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""In-process metrics for the app's hot paths, exported as Prometheus text or JSON.
+
+timed() and count() record into one process-wide registry. Set METRICS_PORT to serve
+/metrics (Prometheus text format) and /metrics.json from a background thread, and
+METRICS_LOG to also append every timing as a JSON line. PROFILE=cprofile (or
+pyinstrument, when installed) writes one profile per profiled request to PROFILE_DIR.
+
+Usage:
+    METRICS_PORT=9108 streamlit run app.py
+    curl localhost:9108/metrics
+"""
+import bisect
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Histogram buckets in seconds, from sub-millisecond lookups up to LLM calls
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Counters and histograms keyed by (name, sorted labels), safe to update from any thread."""
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.help = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def count(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': [
+                    {'name': name, 'labels': dict(labels), 'value': value}
+                    for (name, labels), value in sorted(self.counters.items())
+                ],
+                'histograms': [
+                    {
+                        'name': name, 'labels': dict(labels), 'count': h.count, 'sum': h.sum,
+                        'buckets': dict(zip([str(b) for b in h.buckets] + ['+Inf'], _cumulative(h.counts))),
+                    }
+                    for (name, labels), h in sorted(self.histograms.items())
+                ],
+            }
+
+    def prometheus(self):
+        lines = []
+        snapshot = self.snapshot()
+        typed = set()
+        for counter in snapshot['counters']:
+            name = counter['name']
+            if name not in typed:
+                typed.add(name)
+                lines += _header(name, 'counter', self.help.get(name))
+            lines.append(f"{name}{_labels(counter['labels'])} {counter['value']}")
+        for histogram in snapshot['histograms']:
+            name = histogram['name']
+            if name not in typed:
+                typed.add(name)
+                lines += _header(name, 'histogram', self.help.get(name))
+            for bound, value in histogram['buckets'].items():
+                lines.append(f"{name}_bucket{_labels(dict(histogram['labels'], le=bound))} {value}")
+            lines.append(f"{name}_sum{_labels(histogram['labels'])} {histogram['sum']}")
+            lines.append(f"{name}_count{_labels(histogram['labels'])} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def _cumulative(counts):
+    total, out = 0, []
+    for value in counts:
+        total += value
+        out.append(total)
+    return out
+
+
+def _header(name, kind, text):
+    return ([f"# HELP {name} {text}"] if text else []) + [f"# TYPE {name} {kind}"]
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        f'{key}="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for key, value in labels.items()
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+registry = MetricsRegistry()
+registry.describe('artifact_load_seconds', "Time to load an artifact from disk")
+registry.describe('recommend_seconds', "Time to answer a batch of recommendation queries")
+registry.describe('knn_query_seconds', "Time for live kNN queries for cities missing from the neighbour table")
+registry.describe('page_seconds', "Time to compute the results of one page request")
+registry.describe('city_cards_seconds', "Time to look up URL/info cards for the results grid")
+registry.describe('llm_request_seconds', "Time for a Gemini call, until the last chunk when streaming")
+registry.describe('llm_first_chunk_seconds', "Time until the first streamed Gemini chunk")
+registry.describe('llm_errors_total', "Failed Gemini calls by exception type")
+registry.describe('llm_tokens_total', "Tokens reported by Gemini usage metadata")
+registry.describe('llm_coalesced_total', "Gemini requests that shared an identical call already in flight")
+registry.describe('llm_retries_total', "Gemini calls retried after a retryable error, by exception type")
+registry.describe('llm_throttle_seconds', "Time a Gemini call waited for a concurrency slot and a rate-limit token")
+registry.describe('cache_requests_total', "Cache lookups by cache and result")
+
+_json_log = None
+_json_log_lock = threading.Lock()
+
+
+def _log_json(name, seconds, labels):
+    global _json_log
+    path = os.getenv('METRICS_LOG')
+    if not path:
+        return
+    with _json_log_lock:
+        if _json_log is None:
+            _json_log = open(path, 'a', buffering=1)
+        _json_log.write(json.dumps({'ts': time.time(), 'metric': name, 'seconds': seconds, **labels}) + "\n")
+
+
+def count(name, value=1, **labels):
+    registry.count(name, value, **labels)
+
+
+def observe(name, seconds, **labels):
+    registry.observe(name, seconds, **labels)
+    _log_json(name, seconds, labels)
+
+
+class timed:
+    """Records the duration of a block or function into the histogram `name`.
+
+    Works as a context manager (with timed('x', kind='a'):) and as a decorator."""
+
+    def __init__(self, name, **labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._start
+        observe(self.name, self.seconds, **self.labels)
+        return False
+
+    def __call__(self, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(self.name, **self.labels):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+
+# Function to profile one request when PROFILE is set; writes <PROFILE_DIR>/<name>-<time>.prof/.html
+@contextmanager
+def profile(name):
+    mode = os.getenv('PROFILE', '').lower()
+    if mode not in ('cprofile', 'pyinstrument'):
+        yield
+        return
+    out_dir = os.getenv('PROFILE_DIR', '.cache/profiles')
+    os.makedirs(out_dir, exist_ok=True)
+    stem = os.path.join(out_dir, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{time.perf_counter_ns() % 10**6}")
+
+    if mode == 'pyinstrument':
+        from pyinstrument import Profiler
+
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            with open(stem + '.html', 'w') as f:
+                f.write(profiler.output_html())
+        return
+
+    import cProfile
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Only one cProfile session can run at a time; profile the next request instead
+        yield
+        return
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(stem + '.prof')
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            body, content_type = registry.prometheus().encode(), 'text/plain; version=0.0.4'
+        elif self.path == '/metrics.json':
+            body, content_type = json.dumps(registry.snapshot()).encode(), 'application/json'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+# Function to start the metrics endpoint once per process; returns None when METRICS_PORT is unset
+def start_server(port=None, host=None):
+    global _server
+    port = port if port is not None else os.getenv('METRICS_PORT')
+    if port is None or port == '':
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host or os.getenv('METRICS_HOST', '127.0.0.1'), int(port)), MetricsHandler)
+            except OSError as e:
+                # Another process (e.g. a second Streamlit worker) already serves this port
+                logger.warning("Metrics endpoint not started on port %s: %s", port, e)
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+            logger.info("Serving metrics on http://%s:%d/metrics", *_server.server_address[:2])
+    return _server
@@ -0,0 +1,169 @@
+"""Pickle-free artifact format: one .npy per array plus a small JSON manifest.
+
+Arrays are opened with np.load(mmap_mode='r'), so a cold start only maps the
+files and every worker process on the host shares the same pages through the
+OS page cache.
+
+Usage:
+    python -m src.mmap_artifacts [--out-dir artifacts/mmap]
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+MMAP_DIR = "artifacts/mmap"
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 1
+
+
+def _atomic_save(path, array):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, array, allow_pickle=False)
+    os.replace(tmp_path, path)
+
+
+def _sha1(path, chunk_size=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _labels(index):
+    return [x.item() if hasattr(x, "item") else x for x in index]
+
+
+class MmapWriter:
+    """Collects arrays into a directory and writes the manifest last, so readers
+    never see a manifest that points at half-written files."""
+
+    def __init__(self, out_dir=MMAP_DIR):
+        self.out_dir = out_dir
+        self.entries = {}
+        os.makedirs(out_dir, exist_ok=True)
+
+    def _write(self, name, array, kind, **meta):
+        array = np.ascontiguousarray(array)
+        file_name = f"{name}.npy"
+        path = os.path.join(self.out_dir, file_name)
+        _atomic_save(path, array)
+        self.entries[name] = {
+            "file": file_name,
+            "kind": kind,
+            "dtype": array.dtype.descr if array.dtype.names else array.dtype.str,
+            "shape": list(array.shape),
+            "sha1": _sha1(path),
+            **meta,
+        }
+
+    # Plain numeric matrix (e.g. the similarity matrix)
+    def add_array(self, name, array):
+        self._write(name, np.asarray(array), "array")
+
+    # Numeric DataFrame (e.g. city_pivot); labels go to the manifest
+    def add_frame(self, name, frame):
+        self._write(
+            name, frame.to_numpy(), "frame",
+            index=_labels(frame.index), index_name=frame.index.name,
+            columns=_labels(frame.columns), columns_name=frame.columns.name,
+        )
+
+    # Table of fixed-width records (e.g. c_id/city of place_list, neighbour tables)
+    def add_records(self, name, columns, as_frame=False):
+        columns = {key: np.asarray(value) for key, value in columns.items()}
+        n = len(next(iter(columns.values())))
+        dtype = [(key, value.dtype, value.shape[1:]) for key, value in columns.items()]
+        records = np.empty(n, dtype=dtype)
+        for key, value in columns.items():
+            records[key] = value
+        self._write(name, records, "records", as_frame=as_frame)
+
+    def close(self):
+        manifest = {
+            "version": FORMAT_VERSION,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "arrays": self.entries,
+        }
+        path = os.path.join(self.out_dir, MANIFEST)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp_path, path)
+        return manifest
+
+
+def read_manifest(directory):
+    with open(os.path.join(directory, MANIFEST), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format version {manifest.get('version')} in {directory}")
+    return manifest
+
+
+def _spec(path):
+    directory, file_name = os.path.split(path)
+    for spec in read_manifest(directory)["arrays"].values():
+        if spec["file"] == file_name:
+            return spec
+    raise KeyError(f"{file_name} is not listed in {os.path.join(directory, MANIFEST)}")
+
+
+# Function used by the artifact registry to detect changes without reading the whole file.
+# The file's mtime is part of the digest so a file replaced before its manifest is still seen.
+def manifest_digest(path):
+    return f"{_spec(path)['sha1']}:{os.stat(path).st_mtime_ns}"
+
+
+# Function to open one exported artifact as a read-only memory map
+def load_mmap(path):
+    spec = _spec(path)
+    array = np.load(path, mmap_mode="r", allow_pickle=False)
+    if list(array.shape) != spec["shape"]:
+        raise ValueError(f"{path} has shape {array.shape}, manifest says {spec['shape']}")
+
+    if spec["kind"] == "frame":
+        frame = pd.DataFrame(array, index=spec["index"], columns=spec["columns"], copy=False)
+        frame.index.name = spec["index_name"]
+        frame.columns.name = spec["columns_name"]
+        return frame
+    if spec["kind"] == "records" and spec.get("as_frame"):
+        # Small label tables (place_list) are copied into a DataFrame
+        return pd.DataFrame({key: np.asarray(array[key]) for key in array.dtype.names})
+    return array
+
+
+# Function to export the serving artifacts from the pickles
+def export_mmap(registry, out_dir=MMAP_DIR):
+    writer = MmapWriter(out_dir)
+    travel = registry["place_list"]
+    writer.add_records("place_list", {
+        "c_id": travel["c_id"].to_numpy(),
+        "city": travel["city"].to_numpy().astype(str),
+    }, as_frame=True)
+    if os.path.exists(registry.path("similarity")):
+        writer.add_array("similarity", registry["similarity"])
+    if os.path.exists(registry.path("city_pivot")):
+        writer.add_frame("city_pivot", registry["city_pivot"])
+    for name in ("content_neighbours", "city_neighbours"):
+        if name in registry and os.path.exists(registry.path(name)):
+            writer.add_records(name, registry[name])
+    return writer.close()
+
+
+if __name__ == "__main__":
+    from src.artifacts import ArtifactRegistry
+
+    parser = argparse.ArgumentParser(description="Export pickled artifacts to memory-mappable .npy files")
+    parser.add_argument("--out-dir", default=MMAP_DIR)
+    args = parser.parse_args()
+
+    manifest = export_mmap(ArtifactRegistry(), args.out_dir)
+    for name, spec in manifest["arrays"].items():
+        print(f"{name:>20}  {spec['kind']:<8} {tuple(spec['shape'])}")
@@ -0,0 +1,128 @@
+import os
+
+import numpy as np
+
+from src import metrics
+from src.collaborative import LIVE_OVERFETCH, CityNeighbours, SparseKNN, SparseRatings, stable_order
+
+# Neighbours looked up per rated city (the first one is the city itself), as held by
+# the default neighbour table
+N_NEIGHBOURS = 20
+
+
+# Function to turn kNN distances into similarities in (0, 1]
+def distance_similarity(distances):
+    return 1.0 / (1.0 + np.asarray(distances, dtype=np.float64))
+
+
+class UserRecommender:
+    """Per-user recommendations from the City x User ratings (item-based collaborative filtering).
+
+    A city the user has not rated is scored with the similarity-weighted mean of the
+    user's ratings of its nearest rated cities, read from the precomputed neighbour
+    table (live sparse kNN only for cities missing from it). Ties go to the city
+    closer to more of the user's cities, then to row order."""
+
+    def __init__(self, ratings, table=None, n_neighbours=N_NEIGHBOURS):
+        self.ratings = ratings
+        self.cities = ratings.index.to_numpy()
+        self.by_user = ratings.matrix.tocsc()
+        self.user_index = {str(user): i for i, user in enumerate(ratings.columns.tolist())}
+        self.n_neighbours = n_neighbours
+        self.knn = SparseKNN(ratings.matrix)
+        self.table = table
+        if table is not None:
+            # Neighbour table rows and columns -> rows of the ratings matrix
+            self.table_rows = ratings.index.get_indexer(table.cities)
+            self.rows_in_table = np.full(len(ratings), -1, dtype=np.intp)
+            found = self.table_rows >= 0
+            self.rows_in_table[self.table_rows[found]] = np.flatnonzero(found)
+
+    def __contains__(self, user):
+        return str(user) in self.user_index
+
+    # Function to get (city rows, ratings) of everything the user rated
+    def rated(self, user):
+        col = self.user_index.get(str(user))
+        if col is None:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        start, stop = self.by_user.indptr[col], self.by_user.indptr[col + 1]
+        return self.by_user.indices[start:stop].astype(np.intp), self.by_user.data[start:stop]
+
+    # Function to get (neighbour rows, distances) of the given rows, both (len(rows) x n)
+    def _neighbours(self, rows):
+        n = min(self.n_neighbours, len(self.cities))
+        indices = np.empty((len(rows), n), dtype=np.intp)
+        distances = np.empty((len(rows), n))
+        live = np.ones(len(rows), dtype=bool)
+        if self.table is not None and self.table.k >= n:
+            table_rows = self.rows_in_table[rows]
+            live = table_rows < 0
+            hit = np.flatnonzero(~live)
+            indices[hit] = self.table_rows[self.table.indices[table_rows[hit], :n]]
+            distances[hit] = self.table.distances[table_rows[hit], :n]
+            metrics.count('cache_requests_total', int(len(hit)), cache='city_neighbours', result='hit')
+            metrics.count('cache_requests_total', int(live.sum()), cache='city_neighbours', result='miss')
+        if live.any():
+            with metrics.timed('knn_query_seconds'):
+                d, i = stable_order(*self.knn.kneighbors(
+                    self.ratings.matrix[rows[live]], n_neighbors=min(len(self.cities), n + LIVE_OVERFETCH)
+                ))
+            indices[live] = i[:, :n]
+            distances[live] = d[:, :n]
+        return indices, distances
+
+    # Function to get (cities, predicted ratings) for one user, best first, without the
+    # cities they rated. Unknown users and users without ratings get empty lists.
+    @metrics.timed('recommend_seconds', recommender='personal')
+    def recommend_with_scores(self, user, k=6):
+        rows, values = self.rated(user)
+        if len(rows) == 0:
+            return [], []
+        indices, distances = self._neighbours(rows)
+        weights = distance_similarity(distances)
+        candidates = indices.ravel()
+        keep = ~np.isin(candidates, rows)
+        candidates = candidates[keep]
+        if len(candidates) == 0:
+            return [], []
+        weights = weights.ravel()[keep]
+        user_ratings = np.repeat(values, indices.shape[1])[keep]
+
+        unique, inverse = np.unique(candidates, return_inverse=True)
+        support = np.bincount(inverse, weights=weights)
+        predicted = np.bincount(inverse, weights=weights * user_ratings) / support
+        order = np.lexsort((unique, -np.round(support, 9), -np.round(predicted, 9)))[:k]
+        return self.cities[unique[order]].tolist(), predicted[order].tolist()
+
+    def recommend(self, user, k=6):
+        return self.recommend_with_scores(user, k)[0]
+
+    def recommend_batch_with_scores(self, users, k=6):
+        return [self.recommend_with_scores(user, k) for user in users]
+
+
+def sparse_engine(ratings, table=None):
+    ratings = SparseRatings.from_arrays(ratings)
+    table = CityNeighbours.from_arrays(table) if table is not None else None
+    return UserRecommender(ratings, table)
+
+
+def pivot_engine(city_pivot, table=None):
+    from scipy.sparse import csr_matrix
+
+    ratings = SparseRatings(csr_matrix(city_pivot.to_numpy()), city_pivot.index, city_pivot.columns.astype(str))
+    return UserRecommender(ratings, CityNeighbours.from_arrays(table) if table is not None else None)
+
+
+# Function to get the per-user engine from the artifact registry; like the collaborative
+# engine it prefers city_ratings.npz and falls back to city_pivot.pkl
+def load_engine(registry):
+    has_table = os.path.exists(registry.path('city_neighbours'))
+    if 'city_ratings' in registry and os.path.exists(registry.path('city_ratings')):
+        if has_table:
+            return registry.derived('personal_engine:sparse', sparse_engine, 'city_ratings', 'city_neighbours')
+        return registry.derived('personal_engine:sparse_live', sparse_engine, 'city_ratings')
+    if has_table:
+        return registry.derived('personal_engine:pivot', pivot_engine, 'city_pivot', 'city_neighbours')
+    return registry.derived('personal_engine:pivot_live', pivot_engine, 'city_pivot')
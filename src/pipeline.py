@@ -0,0 +1,371 @@
+"""Offline training pipeline: rebuilds artifacts/ from Data/*.xlsx.
+
+Runs the steps of Content.ipynb and Collaborative.ipynb as cached stages. Each
+stage is fingerprinted on its input files, parameters and upstream stages, and
+is skipped when nothing it depends on has changed. The sheets are read through
+their Parquet copies in Data/store, which are refreshed when a sheet changes.
+
+Stages write their outputs to artifacts/.staging. Once every stage has run, the
+whole set is swapped in with publish(), so a running app or service sees either the
+old or the new artifacts.
+
+Usage:
+    build-artifacts [--force] [--mmap] [--stages place_list ...]
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.artifacts import file_digest, publish
+from src.datastore import DataStore
+from src.tags import STEM_CACHE_PATH, TAG_COLUMNS, build_tags, stem_tags
+
+STATE_PATH = ".cache/build_state.json"
+STAGING_DIR = "artifacts/.staging"
+
+# Columns each stage reads from Data/
+CONTENT_COLUMNS = ["c_id", "city", "overview"] + TAG_COLUMNS
+RATING_COLUMNS = ["User ID", "City ID", "Travel Rating"]
+CITY_COLUMNS = ["City ID", "City", "Country", "Climate"]
+
+
+def _dump_pickle(obj, path):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(obj, f)
+    os.replace(tmp_path, path)
+
+
+def _load_pickle(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+###########################################################################################
+# Collaborative filtering stages (Collaborative.ipynb)
+
+# Function to read the rating log one chunk at a time, keeping only the rows of users
+# with more than min_user_ratings ratings (the first filter of build_final_rating),
+# so the whole log never has to fit in memory
+def read_active_ratings(store, min_user_ratings=1, columns=RATING_COLUMNS):
+    counts = pd.Series(dtype="int64")
+    for chunk in store.iter_chunks("rating", ["User ID"]):
+        chunk_counts = chunk["User ID"].value_counts()
+        chunk_counts.index = chunk_counts.index.astype(str)
+        counts = counts.add(chunk_counts[chunk_counts > 0], fill_value=0)
+    active = counts.index[counts > min_user_ratings]
+
+    chunks = [chunk[chunk["User ID"].isin(active)] for chunk in store.iter_chunks("rating", columns)]
+    ratings = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=columns)
+    # Every chunk has its own categories; re-encode the labels once for the whole log
+    for col in ("User ID", "City ID"):
+        if col in ratings.columns:
+            ratings[col] = ratings[col].astype(str).astype("category")
+    return ratings
+
+
+# Function to keep users with more than min_user_ratings ratings and cities with
+# more than min_city_ratings ratings, joined with the city details
+def build_final_rating(ratings, city, min_user_ratings=1, min_city_ratings=2):
+    x = ratings["User ID"].value_counts() > min_user_ratings
+    ratings = ratings[ratings["User ID"].isin(x[x].index)]
+
+    ratings_with_place = ratings.merge(city, on="City ID")
+    num_rating = ratings_with_place.groupby("City")["Travel Rating"].count().reset_index()
+    num_rating.rename(columns={"Travel Rating": "Total no of Ratings"}, inplace=True)
+
+    final_rating = ratings_with_place.merge(num_rating, on="City")
+    return final_rating[final_rating["Total no of Ratings"] > min_city_ratings]
+
+
+# Dense City x User frame, as in the notebook (only written with dense_pivot=True)
+def build_city_pivot(final_rating):
+    city_pivot = final_rating.pivot_table(columns="User ID", index="City", values="Travel Rating", observed=True)
+    city_pivot.fillna(0, inplace=True)
+    return city_pivot
+
+
+def fit_model(city_pivot):
+    from scipy.sparse import csr_matrix
+    from sklearn.neighbors import NearestNeighbors
+
+    model = NearestNeighbors(algorithm="brute")
+    model.fit(csr_matrix(city_pivot))
+    return model
+
+
+###########################################################################################
+# Pipeline runner
+
+class Stage:
+    def __init__(self, name, build, load, inputs=(), outputs=(), params=None, upstream=()):
+        self.name = name
+        self.build = build
+        self.load = load
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = params or {}
+        self.upstream = list(upstream)
+        self.fingerprint = None
+        self.up_to_date = False
+        self.status = None
+        self.seconds = 0.0
+        self.note = ""
+        self._value = None
+        self._has_value = False
+
+    # Upstream results are loaded from disk only if a downstream stage actually runs
+    @property
+    def value(self):
+        if not self._has_value:
+            self._value = self.load()
+            self._has_value = True
+        return self._value
+
+    def set_value(self, value):
+        self._value = value
+        self._has_value = True
+
+
+class Pipeline:
+    def __init__(self, root=".", force=False, only=None, state_path=STATE_PATH):
+        self.root = root
+        self.force = force
+        self.only = set(only) if only else None
+        self.state_path = os.path.join(root, state_path)
+        self.staging_dir = os.path.join(root, STAGING_DIR)
+        self.stages = []
+        self.staged = {}
+        self.after_swap = []
+
+    def path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    # Function to get the staging path a stage writes artifacts/<name> to
+    def output(self, name):
+        staged_path = os.path.join(self.staging_dir, name)
+        self.staged[self.path("artifacts", name)] = staged_path
+        return staged_path
+
+    def add(self, stage):
+        self.stages.append(stage)
+        return stage
+
+    def _fingerprint(self, stage):
+        payload = {
+            "inputs": {p: file_digest(self.path(p)) for p in stage.inputs},
+            "params": stage.params,
+            "upstream": {up.name: up.fingerprint for up in stage.upstream},
+        }
+        return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _read_state(self):
+        if os.path.exists(self.state_path):
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f)
+        return {}
+
+    def _write_state(self, state):
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.state_path)
+
+    # Function to swap every staged output in together, then run the after_swap steps
+    # (e.g. the mmap export) while readers are still locked out
+    def _publish(self):
+        def after_swap():
+            for step in self.after_swap:
+                step()
+
+        publish(self.staged, self.root, after_swap)
+        self.staged = {}
+        self.after_swap = []
+
+    # Function to pick the stages to build: the selected ones (all by default) that are
+    # out of date or forced, plus every out-of-date stage upstream of a stage being built,
+    # so no stage is built from (and recorded against) an upstream output that is stale
+    def _plan(self, state):
+        for stage in self.stages:
+            stage.fingerprint = self._fingerprint(stage)
+            stage.up_to_date = (
+                state.get(stage.name) == stage.fingerprint
+                and all(os.path.exists(self.path(p)) for p in stage.outputs)
+            )
+        build = set()
+        for stage in reversed(self.stages):
+            selected = self.only is None or stage.name in self.only
+            needed = any(stage in down.upstream for down in self.stages if down.name in build)
+            if (selected and (self.force or not stage.up_to_date)) or (needed and not stage.up_to_date):
+                build.add(stage.name)
+        return build
+
+    # Function to run the stages. Nothing is published, and no stage is recorded as
+    # built, unless every stage succeeds.
+    def run(self):
+        state = self._read_state()
+        build = self._plan(state)
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+        os.makedirs(self.staging_dir)
+        try:
+            for stage in self.stages:
+                if stage.name not in build:
+                    stage.status = "cached" if stage.up_to_date else "skipped"
+                    continue
+
+                start_time = time.perf_counter()
+                stage.set_value(stage.build(*[up.value for up in stage.upstream]))
+                stage.seconds = time.perf_counter() - start_time
+                stage.status = "built"
+                state[stage.name] = stage.fingerprint
+            if self.staged or self.after_swap:
+                self._publish()
+        finally:
+            shutil.rmtree(self.staging_dir, ignore_errors=True)
+        self._write_state(state)
+        return self.stages
+
+    def report(self):
+        total = 0.0
+        for stage in self.stages:
+            total += stage.seconds
+            note = f"  ({stage.note})" if stage.note else ""
+            print(f"{stage.name:<22} {stage.status:<7} {stage.seconds:9.3f} s{note}")
+        print(f"{'total':<22} {'':<7} {total:9.3f} s")
+
+
+# Function to declare the stages of both notebooks
+def build_pipeline(root=".", force=False, only=None, k=20, dense_similarity=True, dense_pivot=True, mmap=False):
+    pipeline = Pipeline(root, force, only)
+    store = DataStore(root, refresh=True)
+    art = lambda name: pipeline.path("artifacts", name)
+    out = pipeline.output
+
+    # place_list.pkl: c_id, city and Porter-stemmed tags
+    def build_place_list():
+        df = store.read("content", CONTENT_COLUMNS)
+        new_df = build_tags(df)
+        new_df["tags"], stemmed = stem_tags(new_df["tags"].tolist(), pipeline.path(STEM_CACHE_PATH))
+        place_list.note = f"{len(new_df)} rows, {stemmed} new words stemmed"
+        _dump_pickle(new_df, out("place_list.pkl"))
+        return new_df
+
+    place_list = pipeline.add(Stage(
+        "place_list", build_place_list, lambda: _load_pickle(art("place_list.pkl")),
+        inputs=["Data/Content.xlsx"], outputs=["artifacts/place_list.pkl"],
+    ))
+
+    # similarity.pkl plus the sparse vectors and neighbour table of the content index
+    def build_content_index(new_df):
+        from scipy import sparse
+        from src.content import SparseSimilarity, fit_vectorizer, save_vocabulary
+
+        vocabulary, vectors = fit_vectorizer(new_df["tags"])
+        index = SparseSimilarity(vectors)
+        sparse.save_npz(out("content_vectors.npz"), index.vectors)
+        save_vocabulary(vocabulary, out("content_vocabulary.json"))
+        table = index.neighbour_table(k)
+        np.savez(out("content_neighbours.npz"), indices=table.indices, scores=table.scores)
+        if dense_similarity:
+            # Same values as cosine_similarity(vector) in Content.ipynb
+            _dump_pickle((index.vectors @ index.vectors.T).toarray(), out("similarity.pkl"))
+        return index
+
+    content_outputs = ["artifacts/content_vectors.npz", "artifacts/content_neighbours.npz", "artifacts/content_vocabulary.json"]
+    if dense_similarity:
+        content_outputs.append("artifacts/similarity.pkl")
+    content_index = pipeline.add(Stage(
+        "content_index", build_content_index, lambda: None,
+        outputs=content_outputs, params={"k": k, "dense_similarity": dense_similarity},
+        upstream=[place_list],
+    ))
+
+    # final_rating.pkl: filtered ratings joined with City.xlsx
+    def build_ratings():
+        ratings = read_active_ratings(store, min_user_ratings=1)
+        city = store.read("city", CITY_COLUMNS)
+        final_rating = build_final_rating(ratings, city)
+        _dump_pickle(final_rating, out("final_rating.pkl"))
+        return final_rating
+
+    final_rating = pipeline.add(Stage(
+        "final_rating", build_ratings, lambda: _load_pickle(art("final_rating.pkl")),
+        inputs=["Data/Rating.xlsx", "Data/City.xlsx"], outputs=["artifacts/final_rating.pkl"],
+        params={"min_user_ratings": 1, "min_city_ratings": 2},
+    ))
+
+    # city_ratings.npz (CSR from the rating triplets), city_name.pkl and the neighbour
+    # table; city_pivot.pkl and model.pkl only when the dense pivot is requested
+    def build_collaborative(final_rating):
+        from src.collaborative import SparseKNN, SparseRatings, build_neighbour_table
+
+        ratings = SparseRatings.from_triplets(final_rating)
+        table = build_neighbour_table(SparseKNN(ratings.matrix), ratings, k)
+        np.savez(out("city_ratings.npz"), **ratings.to_arrays())
+        np.savez(out("city_neighbours.npz"), **table.to_arrays())
+        _dump_pickle(ratings.index, out("city_name.pkl"))
+        collaborative.note = f"{ratings.matrix.nnz} ratings, {len(ratings)} cities x {len(ratings.columns)} users"
+
+        if dense_pivot:
+            city_pivot = build_city_pivot(final_rating)
+            _dump_pickle(fit_model(city_pivot), out("model.pkl"))
+            _dump_pickle(city_pivot, out("city_pivot.pkl"))
+        return ratings
+
+    collaborative_outputs = ["artifacts/city_ratings.npz", "artifacts/city_neighbours.npz", "artifacts/city_name.pkl"]
+    if dense_pivot:
+        collaborative_outputs += ["artifacts/model.pkl", "artifacts/city_pivot.pkl"]
+    collaborative = pipeline.add(Stage(
+        "collaborative", build_collaborative, lambda: None,
+        outputs=collaborative_outputs, params={"k": k, "dense_pivot": dense_pivot},
+        upstream=[final_rating],
+    ))
+
+    # artifacts/mmap is exported from the published artifacts, inside publish()
+    if mmap:
+        def build_mmap(*_):
+            from src.artifacts import ArtifactRegistry
+            from src.mmap_artifacts import export_mmap
+
+            pipeline.after_swap.append(lambda: export_mmap(ArtifactRegistry(root=root), pipeline.path("artifacts", "mmap")))
+
+        pipeline.add(Stage(
+            "mmap", build_mmap, lambda: None,
+            outputs=["artifacts/mmap/manifest.json"],
+            upstream=[place_list, content_index, collaborative],
+        ))
+
+    return pipeline
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild artifacts/ from Data/*.xlsx")
+    parser.add_argument("--root", default=".", help="project directory containing Data/ and artifacts/")
+    parser.add_argument("--force", action="store_true", help="rebuild every selected stage")
+    parser.add_argument("--stages", nargs="*", help="only run these stages (and out-of-date stages upstream of them)")
+    parser.add_argument("-k", type=int, default=20, help="neighbours kept per place/city")
+    parser.add_argument("--no-dense-similarity", action="store_true",
+                        help="skip the N x N similarity.pkl (use CONTENT_INDEX=sparse or neighbours)")
+    parser.add_argument("--no-dense-pivot", action="store_true",
+                        help="skip city_pivot.pkl and model.pkl (the app serves from city_ratings.npz)")
+    parser.add_argument("--mmap", action="store_true", help="also export artifacts/mmap")
+    args = parser.parse_args(argv)
+
+    pipeline = build_pipeline(
+        args.root, args.force, args.stages, args.k,
+        dense_similarity=not args.no_dense_similarity, dense_pivot=not args.no_dense_pivot, mmap=args.mmap,
+    )
+    pipeline.run()
+    pipeline.report()
+
+
+if __name__ == "__main__":
+    main()
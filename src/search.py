@@ -0,0 +1,222 @@
+import bisect
+import re
+import unicodedata
+
+import numpy as np
+
+# Alternative spellings and former names -> name used in the dataset
+ALIASES = {
+    'Bangalore': 'Bengaluru',
+    'Bombay': 'Mumbai',
+    'Calcutta': 'Kolkata',
+    'Cochin': 'Kochi',
+    'Peking': 'Beijing',
+    'Kiev': 'Kyiv',
+    'Isfahan': 'Esfahan',
+    'Marrakech': 'Marrakesh',
+    'Marseille': 'Marseilles',
+    'Medina': 'Madinah',
+    "Xi'an": 'Xian',
+    'New York': 'New York City',
+    'NYC': 'New York City',
+    'LA': 'Los Angeles',
+    'Rio': 'Rio de Janeiro',
+    'Saint Petersburg': 'St. Petersburg',
+    'St Tropez': 'Saint Tropez',
+    'Quebec': 'Quebec City',
+    'Zanzibar': 'Zanzibar City',
+    "Sana'a": 'Sanaa',
+    'Mexico DF': 'Mexico City',
+}
+
+# Fuzzy lookups count trigram overlaps over at most this many posting entries,
+# taking the query's rarest trigrams first (always at least MIN_GRAMS of them)
+POSTINGS_BUDGET = 4000
+MIN_GRAMS = 3
+# Fuzzy candidates (by trigram overlap) re-ranked by edit distance
+FUZZY_CANDIDATES = 10
+
+_non_alnum = re.compile(r"[^0-9a-z]+")
+
+
+# Function to normalize a city name or query: no accents, case or punctuation
+def normalize(text):
+    text = str(text)
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text)
+        text = ''.join(c for c in text if not unicodedata.combining(c))
+    return _non_alnum.sub(' ', text.casefold()).strip()
+
+
+# Function to get the key plus every way of deleting one character from it
+def deletions(key):
+    return {key} | {key[:i] + key[i + 1:] for i in range(len(key))}
+
+
+def trigrams(key):
+    padded = f"$${key}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# Function to get the optimal string alignment distance (Levenshtein plus adjacent swaps).
+# Bit-parallel (Myers/Hyyro): one pass over b with a's columns packed into an int.
+def edit_distance(a, b):
+    m = len(a)
+    if m == 0:
+        return len(b)
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+    peq = {}
+    for i, c in enumerate(a):
+        peq[c] = peq.get(c, 0) | (1 << i)
+    vp, vn, d0, pm_prev, score = full, 0, 0, 0, m
+    for c in b:
+        pm = peq.get(c, 0)
+        transposed = (((~d0) & pm) << 1) & pm_prev
+        d0 = ((((pm & vp) + vp) ^ vp) | pm | vn | transposed) & full
+        hp = (vn | ~(d0 | vp)) & full
+        hn = d0 & vp
+        if hp & last:
+            score += 1
+        elif hn & last:
+            score -= 1
+        hp = ((hp << 1) | 1) & full
+        hn = (hn << 1) & full
+        vp = (hn | ~(d0 | hp)) & full
+        vn = hp & d0
+        pm_prev = pm
+    return score
+
+
+class CitySearchIndex:
+    """Autocomplete and typo-tolerant lookup over city names and their aliases.
+
+    Exact and prefix matches (also on later words, e.g. 'york' -> 'New York City') come
+    from a dict and a sorted key list. Single typos are found through a hashed
+    deletion-neighbourhood table; anything further off goes through a trigram index
+    whose best candidates are re-ranked by edit distance."""
+
+    def __init__(self, names, aliases=None):
+        self.names = list(dict.fromkeys(names))
+        ids = self._ids = {name: i for i, name in enumerate(self.names)}
+        aliases = ALIASES if aliases is None else aliases
+
+        # (normalized key, name id); aliases only for names present in this catalogue
+        entries = [(normalize(name), i) for i, name in enumerate(self.names)]
+        entries += [(normalize(alias), ids[name]) for alias, name in aliases.items() if name in ids]
+        entries = [(key, i) for key, i in entries if key]
+        self.exact = {}
+        for key, i in entries:
+            self.exact.setdefault(key, i)
+
+        # Prefix search over every word boundary of every key
+        prefixes = sorted({
+            (key[start:], i)
+            for key, i in entries
+            for start in [0] + [m.end() for m in re.finditer(' ', key)]
+        })
+        self.prefix_keys = [key for key, _ in prefixes]
+        self.prefix_ids = np.array([i for _, i in prefixes], dtype=np.int64)
+
+        self.keys = list(self.exact)
+        self.key_ids = np.array([self.exact[key] for key in self.keys], dtype=np.int64)
+
+        # Single-deletion neighbourhood of every key, stored as sorted (hash, key row) arrays:
+        # two keys within one edit of each other always share an entry
+        variants = [deletions(key) for key in self.keys]
+        hashes = np.fromiter((hash(v) for vs in variants for v in vs), dtype=np.int64)
+        rows = np.repeat(np.arange(len(self.keys)), [len(vs) for vs in variants])
+        order = np.argsort(hashes, kind='stable')
+        self.deletion_hashes = hashes[order]
+        self.deletion_rows = rows[order]
+
+        # Trigram postings for fuzzier matches: gram -> key rows
+        postings = {}
+        for row, key in enumerate(self.keys):
+            for gram in trigrams(key):
+                postings.setdefault(gram, []).append(row)
+        self.postings = {gram: np.array(rows, dtype=np.int64) for gram, rows in postings.items()}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    def _prefix(self, key, limit):
+        start = bisect.bisect_left(self.prefix_keys, key)
+        stop = bisect.bisect_left(self.prefix_keys, key + '￿', lo=start)
+        found = dict.fromkeys(self.prefix_ids[start:stop].tolist())
+        # Shorter names first (closest to what was typed), then alphabetically
+        return sorted(found, key=lambda i: (len(self.names[i]), self.names[i]))[:limit]
+
+    # Function to get the names one edit away from key as [(name id, edit distance)]
+    def _one_edit(self, key):
+        hashes = np.array([hash(variant) for variant in deletions(key)], dtype=np.int64)
+        starts = np.searchsorted(self.deletion_hashes, hashes, 'left')
+        stops = np.searchsorted(self.deletion_hashes, hashes, 'right')
+        rows = {row for start, stop in zip(starts.tolist(), stops.tolist()) for row in self.deletion_rows[start:stop].tolist()}
+        found = {}
+        for row in rows:
+            # Shared deletions can also pair keys two edits apart (or collide); check each one
+            if edit_distance(key, self.keys[row]) <= 1:
+                found.setdefault(int(self.key_ids[row]), 1)
+        return sorted(found.items(), key=lambda item: self.names[item[0]])
+
+    # Function to get the closest names to a misspelled key as [(name id, edit distance)]
+    def _fuzzy(self, key, limit):
+        close = self._one_edit(key)
+        if len(close) >= limit:
+            return close[:limit]
+        lists = sorted((self.postings[g] for g in trigrams(key) if g in self.postings), key=len)
+        if not lists:
+            return []
+        used, total = 0, 0
+        for postings in lists:
+            if used >= MIN_GRAMS and total + len(postings) > POSTINGS_BUDGET:
+                break
+            used += 1
+            total += len(postings)
+        rows, shared = np.unique(np.concatenate(lists[:used]), return_counts=True)
+        if len(rows) > FUZZY_CANDIDATES:
+            top = np.argpartition(-shared, FUZZY_CANDIDATES - 1)[:FUZZY_CANDIDATES]
+            rows, shared = rows[top], shared[top]
+
+        best = {}
+        for row, count in zip(rows.tolist(), shared.tolist()):
+            distance = edit_distance(key, self.keys[row])
+            i = int(self.key_ids[row])
+            if i not in best or (distance, -count) < best[i]:
+                best[i] = (distance, -count)
+        ranked = sorted(best.items(), key=lambda item: (item[1], self.names[item[0]]))
+        close_ids = {i for i, _ in close}
+        return (close + [(i, distance) for i, (distance, _) in ranked if i not in close_ids])[:limit]
+
+    # Function to get ranked suggestions for what the user typed so far
+    def search(self, query, limit=10):
+        key = normalize(query)
+        if not key:
+            return []
+        ids = []
+        if key in self.exact:
+            ids.append(self.exact[key])
+        ids += [i for i in self._prefix(key, limit) if i not in ids]
+        if len(ids) < limit:
+            ids += [i for i, _ in self._fuzzy(key, limit) if i not in ids]
+        return [self.names[i] for i in ids[:limit]]
+
+    # Function to map free text to one city name: exact/alias match, a unique prefix,
+    # or the closest name within max(1, len // 3) edits. Returns None if nothing is close.
+    def resolve(self, query):
+        key = normalize(query)
+        if not key:
+            return None
+        if key in self.exact:
+            return self.names[self.exact[key]]
+        prefix = self._prefix(key, 2)
+        if len(prefix) == 1:
+            return self.names[prefix[0]]
+        fuzzy = self._fuzzy(key, 1)
+        if fuzzy and fuzzy[0][1] <= max(1, len(key) // 3):
+            return self.names[fuzzy[0][0]]
+        return None
@@ -0,0 +1,287 @@
+"""Headless HTTP/JSON recommendation service.
+
+Concurrent requests are collected by a micro-batcher and answered with one
+vectorized recommend_all_batch() call. Each worker process loads the artifacts
+before it starts accepting connections, so no request pays the cold start.
+
+Endpoints:
+    GET  /health
+    GET  /cities
+    GET  /search?q=pari[&limit=10]
+    GET  /recommend?city=Paris[&k=6]   (typos and aliases are resolved; "query" echoes the input)
+    GET  /recommend/user?user=U-1[&k=6]   (cities picked from the user's own ratings)
+    POST /recommend/batch   {"cities": ["Paris", "Rome"], "k": 6}   (each city resolved like GET /recommend)
+    GET  /stats
+    GET  /metrics           Prometheus text format (src/metrics.py)
+
+Usage:
+    recommend-service [--port 8000] [--workers 4]
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from src import metrics
+from src.engine import N_RECOMMENDATIONS, RecommendationEngine
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Collects items submitted from many threads and hands them to fn in batches
+    of up to max_batch, waiting at most max_wait seconds for a batch to fill."""
+
+    def __init__(self, fn, max_batch=64, max_wait=0.002):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            items = [item for item, _ in batch]
+            try:
+                results = self.fn(items)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(items)
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "queued": self._queue.qsize(),
+        }
+
+
+class RecommendationService:
+    def __init__(self, engine=None, max_batch=64, max_wait=0.002):
+        self.engine = engine or RecommendationEngine()
+        # Requests with different k cannot share a vectorized call, so batch per k
+        self._batchers = {}
+        self._lock = threading.Lock()
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+
+    def _batcher(self, k):
+        with self._lock:
+            batcher = self._batchers.get(k)
+            if batcher is None:
+                batcher = self._batchers[k] = MicroBatcher(
+                    lambda cities: self.engine.recommend_all_batch(cities, k), self.max_batch, self.max_wait
+                )
+        return batcher
+
+    def recommend(self, city, k=N_RECOMMENDATIONS):
+        return self._batcher(k).submit(city).result()
+
+    def recommend_many(self, cities, k=N_RECOMMENDATIONS):
+        return self.engine.recommend_all_batch(cities, k)
+
+    def stats(self):
+        return {
+            "pid": os.getpid(),
+            "batchers": {str(k): b.stats() for k, b in self._batchers.items()},
+            "artifacts": self.engine.registry.stats(),
+        }
+
+
+class RecommendationHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def _send(self, status, data, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, status, body):
+        self._send(status, json.dumps(body).encode(), "application/json")
+
+    # Function to validate k: an integer from the query string or the JSON body (not a
+    # float or a boolean, which int() would silently truncate or accept)
+    def _k(self, value):
+        if value is None:
+            return N_RECOMMENDATIONS
+        if isinstance(value, str):
+            try:
+                value = int(value)
+            except ValueError:
+                raise ValueError("k must be an integer") from None
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise ValueError("k must be an integer")
+        k = value
+        if not 1 <= k <= 100:
+            raise ValueError("k must be between 1 and 100")
+        return k
+
+    # Function to run one route: a ValueError is the client's fault (400); anything else
+    # is logged and answered with a 500 instead of dropping the connection
+    def _handle(self, route):
+        try:
+            route()
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+        except Exception:
+            logger.exception("Error answering %s %s", self.command, self.path)
+            self._send_json(500, {"error": "internal server error"})
+
+    def do_GET(self):
+        self._handle(self._get)
+
+    def do_POST(self):
+        self._handle(self._post)
+
+    def _get(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        service = self.server.service
+        if url.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif url.path == "/cities":
+            self._send_json(200, {"cities": service.engine.place_list()})
+        elif url.path == "/search":
+            limit = int(query.get("limit", [10])[0])
+            self._send_json(200, {"cities": service.engine.search(query.get("q", [""])[0], limit)})
+        elif url.path == "/recommend":
+            if "city" not in query:
+                raise ValueError("missing 'city' parameter")
+            k = self._k(query.get("k", [None])[0])
+            city = query["city"][0]
+            with metrics.timed("page_seconds", page="service_recommend"):
+                resolved = service.engine.resolve(city) or city
+                result = service.recommend(resolved, k)
+            self._send_json(200, dict(result, query=city))
+        elif url.path == "/recommend/user":
+            if "user" not in query:
+                raise ValueError("missing 'user' parameter")
+            k = self._k(query.get("k", [None])[0])
+            with metrics.timed("page_seconds", page="service_recommend_user"):
+                result = service.engine.recommend_user(query["user"][0].strip(), k)
+            self._send_json(200, result)
+        elif url.path == "/stats":
+            self._send_json(200, service.stats())
+        elif url.path == "/metrics":
+            self._send(200, metrics.registry.prometheus().encode(), "text/plain; version=0.0.4")
+        else:
+            self._send_json(404, {"error": f"unknown path {url.path}"})
+
+    def _post(self):
+        url = urlparse(self.path)
+        if url.path != "/recommend/batch":
+            self._send_json(404, {"error": f"unknown path {url.path}"})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(body, dict):
+            raise ValueError("the request body must be a JSON object")
+        cities = body.get("cities")
+        if not isinstance(cities, list) or not all(isinstance(c, str) for c in cities):
+            raise ValueError("'cities' must be a list of city names")
+        k = self._k(body.get("k"))
+        service = self.server.service
+        with metrics.timed("page_seconds", page="service_recommend_batch"):
+            # Same matching as GET /recommend: aliases, case and typos map to a known city
+            resolved = [service.engine.resolve(city) or city for city in cities]
+            results = service.recommend_many(resolved, k)
+        self._send_json(200, {"results": [dict(result, query=city) for result, city in zip(results, cities)]})
+
+
+class RecommendationServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service, reuse_port=False):
+        self.service = service
+        self.reuse_port = reuse_port
+        super().__init__(address, RecommendationHandler)
+
+    def server_bind(self):
+        if self.reuse_port:
+            # Lets several worker processes accept on the same port (Linux/BSD)
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+
+# Function to run one warm worker: load every artifact, then start serving
+def serve(host="127.0.0.1", port=8000, reuse_port=False, max_batch=64, max_wait=0.002):
+    start_time = time.perf_counter()
+    service = RecommendationService(RecommendationEngine().warm_up(), max_batch, max_wait)
+    server = RecommendationServer((host, port), service, reuse_port)
+    logger.info(
+        "Worker %d ready on http://%s:%d after %.2f seconds",
+        os.getpid(), host, server.server_address[1], time.perf_counter() - start_time,
+    )
+    server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recommendation HTTP/JSON service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="warm worker processes sharing the port")
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(process)d %(levelname)s %(message)s")
+
+    options = dict(max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000)
+    if args.workers <= 1:
+        serve(args.host, args.port, **options)
+        return
+
+    import multiprocessing
+
+    workers = [
+        multiprocessing.Process(target=serve, args=(args.host, args.port, True), kwargs=options, daemon=True)
+        for _ in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Tag preprocessing for the content model (the tag steps of Content.ipynb).
+
+build_tags() joins overview, climate, keywords, travel_style and activities into one
+lower-cased tag string per place with column-wise pandas string ops. stem_tags()
+Porter-stems those strings through a token -> stem table: each distinct word is
+stemmed once, and the table is kept in .cache/ so later builds only stem words they
+have not seen. Large batches of new words are stemmed in worker processes.
+
+Usage:
+    python -m src.tags Data/Content.xlsx [--out place_list.pkl] [--workers 4]
+"""
+import argparse
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+STEM_CACHE_PATH = ".cache/stem_table.pkl"
+
+# New words to stem before it is worth starting worker processes
+PARALLEL_MIN_TOKENS = 20000
+
+TAG_COLUMNS = ["climate", "keywords", "travel_style", "activities"]
+
+
+# Function to build the un-stemmed, lower-cased tag string of every place.
+# Same tokens as the notebook: overview split on whitespace, the other columns split
+# on commas after removing spaces. Like the notebook, a place with a missing value
+# in any of these columns gets no tags.
+def build_tags(df):
+    columns = ["overview"] + TAG_COLUMNS
+    parts = [df["overview"].fillna("").astype(str).str.replace(r"\s+", " ", regex=True).str.strip()]
+    for col in TAG_COLUMNS:
+        parts.append(
+            df[col].fillna("").astype(str).str.replace(" ", "", regex=False).str.replace(",", " ", regex=False)
+        )
+    new_df = df[["c_id", "city"]].copy()
+    new_df["tags"] = parts[0].str.cat(parts[1:], sep=" ").str.lower()
+    new_df.loc[df[columns].isna().any(axis=1), "tags"] = ""
+    return new_df
+
+
+def _stem_words(words):
+    from nltk.stem import PorterStemmer
+
+    ps = PorterStemmer()
+    return [ps.stem(word) for word in words]
+
+
+class StemTable:
+    """Memoized token -> Porter stem table, loaded from and saved to path when given."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.table = {}
+        self.added = 0
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                self.table = pickle.load(f)
+
+    def __len__(self):
+        return len(self.table)
+
+    # Function to stem every word missing from the table, in worker processes when there are many
+    def add(self, words, workers=None):
+        todo = sorted(set(words) - self.table.keys())
+        if not todo:
+            return 0
+        workers = workers or os.cpu_count() or 1
+        if len(todo) >= PARALLEL_MIN_TOKENS and workers > 1:
+            chunks = [todo[i::workers] for i in range(workers)]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_stem_words, chunks))
+            stemmed = [None] * len(todo)
+            for i, chunk in enumerate(results):
+                stemmed[i::workers] = chunk
+        else:
+            stemmed = _stem_words(todo)
+        self.table.update(zip(todo, stemmed))
+        self.added += len(todo)
+        return len(todo)
+
+    # Function to stem whitespace-separated texts word by word
+    def stem(self, texts, workers=None):
+        texts = list(texts)
+        self.add(" ".join(texts).split(), workers)
+        lookup = self.table.__getitem__
+        return [" ".join(map(lookup, text.split())) for text in texts]
+
+    def save(self):
+        if not self.path or not self.added:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self.table, f)
+        os.replace(tmp_path, self.path)
+        self.added = 0
+
+
+# Function to Porter-stem one tag string (Content.ipynb's stems())
+def stems(text):
+    return StemTable().stem([text])[0]
+
+
+# Function to stem tag strings through the cached stem table.
+# Returns (stemmed strings, number of words that were not in the cache).
+def stem_tags(tags, cache_path=STEM_CACHE_PATH, workers=None):
+    table = StemTable(cache_path)
+    stemmed = table.stem(tags, workers)
+    added = table.added
+    table.save()
+    return stemmed, added
+
+
+def main(argv=None):
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Build stemmed place tags from a Content.xlsx-style sheet")
+    parser.add_argument("content", help="spreadsheet with c_id, city and the tag columns")
+    parser.add_argument("--out", help="write the (c_id, city, tags) frame to this pickle")
+    parser.add_argument("--cache", default=STEM_CACHE_PATH, help="stem table file ('' to disable)")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    df = pd.read_pickle(args.content) if args.content.endswith(".pkl") else pd.read_excel(args.content)
+    start_time = time.perf_counter()
+    new_df = build_tags(df)
+    built = time.perf_counter()
+    new_df["tags"], added = stem_tags(new_df["tags"].tolist(), args.cache or None, args.workers)
+    print(
+        f"{len(new_df)} places: tags built in {built - start_time:.2f}s, "
+        f"stemmed in {time.perf_counter() - built:.2f}s ({added} new words)"
+    )
+    if args.out:
+        new_df.to_pickle(args.out)
+
+
+if __name__ == "__main__":
+    main()